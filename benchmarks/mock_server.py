@@ -0,0 +1,151 @@
+# Local stand-in for https://oss.x-lab.info/open_digger/github/ used by the benchmarks.
+#
+# Serves synthetic but deterministic data for every file opendigger reads, for any
+# <owner>/<repo>. `months` sets the history length of every file, `latency` is added
+# to each response and `detail` sets the size of the per month lists and networks.
+# Repositories whose name contains "missing" answer 404.
+#
+#   python benchmarks/mock_server.py --port 8765 --latency 0.05 --months 240
+#   OPENDIGGER_PREFIX=http://127.0.0.1:8765/open_digger/github/ opendigger -repo a/b -index all
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+distribution_files = {"issue_response_time", "issue_resolution_duration", "issue_age",
+                      "change_request_response_time", "change_request_resolution_duration"}
+list_files = {"new_contributors_detail", "bus_factor_detail"}
+network_files = {"developer_network", "repo_network"}
+raw_key = "2021-10-raw"
+
+
+def month_keys(months, end_year=2024):
+    keys = []
+    for i in range(months):
+        ordinal = end_year * 12 - months + i
+        keys.append(f"{ordinal // 12:04d}-{ordinal % 12 + 1:02d}")
+    return keys
+
+
+# body of one file, the same for the same repo, file and settings
+def payload(repo_name, file_name, months, detail):
+    r = random.Random(f"{repo_name}/{file_name}")
+    keys = month_keys(months)
+    if file_name in distribution_files:
+        return {
+            "avg": {m: round(r.random() * 10, 2) for m in keys},
+            "levels": {m: [r.randint(0, 20) for _ in range(4)] for m in keys},
+            **{f"quantile_{q}": {m: round(r.random() * 5 * (q + 1), 2) for m in keys} for q in range(5)},
+        }
+    if file_name in list_files:
+        return {m: [f"user{r.randint(0, 10 * detail)}" for _ in range(detail)] for m in keys}
+    if file_name == "active_dates_times":
+        return {m: [r.randint(0, 5) for _ in range(24 * 7)] for m in keys}
+    if file_name in network_files:
+        nodes = [[f"node{i}", round(r.random() * 10, 2)] for i in range(detail * 10)]
+        edges = [[f"node{r.randrange(detail * 10)}", f"node{r.randrange(detail * 10)}", round(r.random(), 2)]
+                 for _ in range(detail * 40)]
+        return {"nodes": nodes, "edges": edges}
+    # like OpenDigger, monthly counts end with the raw value of the month they were recomputed
+    if file_name in ("openrank", "activity", "attention"):
+        return {**{m: round(r.random() * 100, 2) for m in keys}, raw_key: round(r.random() * 100, 2)}
+    return {**{m: r.randint(0, 500) for m in keys}, raw_key: r.randint(0, 500)}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.count()
+        if server.latency:
+            time.sleep(server.latency)
+        path = self.path.split("?", 1)[0]
+        parts = path.rstrip("/").split("/")
+        if len(parts) < 3 or not parts[-1].endswith(".json") or "missing" in path:
+            self.send_empty(404)
+            return
+        repo_name = "/".join(parts[-3:-1])
+        body = server.body(repo_name, parts[-1][:-len(".json")])
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_empty(304, etag)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_empty(self, code, etag=None):
+        self.send_response(code)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # many clients connect at once, the default backlog of 5 drops connections
+    request_queue_size = 128
+
+    def __init__(self, port=0, latency=0, months=120, detail=5):
+        super().__init__(("127.0.0.1", port), MockHandler)
+        self.latency = latency
+        self.months = months
+        self.detail = detail
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.bodies = {}
+
+    @property
+    def prefix(self):
+        return f"http://127.0.0.1:{self.server_port}/open_digger/github/"
+
+    def count(self):
+        with self.lock:
+            self.requests += 1
+
+    def body(self, repo_name, file_name):
+        key = (repo_name, file_name)
+        if key not in self.bodies:
+            self.bodies[key] = json.dumps(payload(repo_name, file_name, self.months, self.detail)).encode()
+        return self.bodies[key]
+
+    # clients that hang up mid-response (a stream closed early, a cancelled download)
+    # are expected, only other errors are printed
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic OpenDigger data on localhost.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0, help="Seconds added to every response.")
+    parser.add_argument("--months", type=int, default=120, help="History length of every file.")
+    parser.add_argument("--detail", type=int, default=5, help="Size of the per month lists and networks.")
+    args = parser.parse_args()
+    server = MockServer(args.port, args.latency, args.months, args.detail)
+    print(f"Serving on {server.prefix}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
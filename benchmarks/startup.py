@@ -0,0 +1,69 @@
+# Startup time benchmark for the opendigger command.
+#
+# Runs `opendigger --help` and a single month query against the local mock server
+# several times and fails when the median wall time is above the target, or when
+# a text only query loads one of the plotting backends.
+#
+#   python benchmarks/startup.py --runs 10 --target 0.5
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+from mock_server import MockServer
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+entry = "from opendigger.opendigger import main; main()"
+heavy_modules = ["numpy", "plotext", "matplotlib"]
+
+
+def time_command(args, env, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", entry] + args, env=env, cwd=root,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def loaded_heavy_modules(args, env):
+    code = (f"import sys; sys.argv = ['opendigger'] + {args!r}; {entry}; "
+            f"print('loaded:' + ','.join(m for m in {heavy_modules!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], env=env, cwd=root, capture_output=True, text=True)
+    loaded = result.stdout.rsplit("loaded:", 1)[-1].strip()
+    return loaded.split(",") if loaded else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark opendigger startup time.")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per command, the median is reported.")
+    parser.add_argument("--target", type=float, default=0.5, help="Maximum median seconds per command.")
+    args = parser.parse_args()
+
+    server = MockServer().start()
+    env = dict(os.environ, OPENDIGGER_PREFIX=server.prefix)
+
+    commands = {
+        "--help": ["--help"],
+        "-index openrank -month": ["-repo", "bench/repo", "-index", "openrank", "-month", "2023-01", "--no-cache"],
+        "-index all -month": ["-repo", "bench/repo", "-index", "all", "-month", "2023-01", "--no-cache"],
+    }
+    failed = False
+    for name, command in commands.items():
+        median = time_command(command, env, args.runs)
+        status = "ok" if median <= args.target else "SLOW"
+        failed |= median > args.target
+        print(f"{name:<25} {median * 1000:8.1f} ms  {status}")
+    heavy = loaded_heavy_modules(commands["-index openrank -month"], env)
+    if heavy:
+        failed = True
+        print(f"month query imported plotting backends: {', '.join(heavy)}")
+    server.shutdown()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
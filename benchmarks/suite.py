@@ -0,0 +1,145 @@
+# End to end benchmark suite for the opendigger command.
+#
+# Runs the common commands against the local mock server (mock_server.py) and
+# records, per command, the median wall time, the requests the server received,
+# the peak resident memory of the opendigger process (chart worker processes
+# not included) and the number of charts rendered, plus
+# the time to render one report chart. Results are printed and written as json so
+# they can be compared between releases.
+#
+#   python benchmarks/suite.py --runs 5 --latency 0.02 --months 240 --output results.json
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+from mock_server import MockServer
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+entry = "from opendigger.opendigger import main; main()"
+default_output = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark-results.json")
+
+scenarios = {
+    "index-all": ["-index", "all"],
+    "metric-all": ["-metric", "all"],
+    "report-md": ["-index", "all", "-metric", "all", "-d", "md"],
+    "month-all": ["-index", "all", "-metric", "all", "-month", "2023-06"],
+}
+
+
+# one run in a fresh working directory: wall seconds, requests, peak rss bytes, charts rendered
+def run_once(args, env, server):
+    workdir = tempfile.mkdtemp(prefix="opendigger-bench-")
+    requests = server.requests
+    try:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "-c", entry] + args, env=env, cwd=workdir,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = process.stdout.read()
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.stdout.close()
+        if status:
+            raise RuntimeError(f"{' '.join(args)} failed:\n{output.decode(errors='replace')}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    # ru_maxrss is in kilobytes on linux and in bytes on macOS
+    rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return elapsed, server.requests - requests, rss, charts_rendered(output.decode(errors="replace"))
+
+
+def charts_rendered(output):
+    for line in output.splitlines():
+        if line.startswith("Charts: "):
+            return int(line.split()[1])
+    return 0
+
+
+def run_scenario(args, env, server, runs):
+    results = [run_once(args, env, server) for _ in range(runs)]
+    timings = [result[0] for result in results]
+    return {
+        "args": args,
+        "runs": runs,
+        "median_seconds": statistics.median(timings),
+        "min_seconds": min(timings),
+        "max_seconds": max(timings),
+        "requests": results[-1][1],
+        "peak_rss_bytes": max(result[2] for result in results),
+        "charts": results[-1][3],
+    }
+
+
+# median seconds to render one report line chart of `months` points in this process
+def chart_render_time(months, runs):
+    sys.path.insert(0, root)
+    from opendigger.render import render_line_chart
+
+    dates = [f"{i % 12 + 1:02d}/{2000 + i // 12}" for i in range(months)]
+    values = [float(i % 37) for i in range(months)]
+    folder = tempfile.mkdtemp(prefix="opendigger-bench-")
+    try:
+        render_line_chart(os.path.join(folder, "warmup.png"), dates, values, "Bench", "red")
+        timings = []
+        for i in range(runs):
+            start = time.perf_counter()
+            render_line_chart(os.path.join(folder, f"chart{i}.png"), dates, values, "Bench", "red")
+            timings.append(time.perf_counter() - start)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return statistics.median(timings)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark opendigger commands against a local mock server.")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per command, the median is reported.")
+    parser.add_argument("--latency", type=float, default=0.01, help="Seconds the mock server adds to each response.")
+    parser.add_argument("--months", type=int, default=120, help="History length of every mock file.")
+    parser.add_argument("--detail", type=int, default=5, help="Size of the mock per month lists and networks.")
+    parser.add_argument("--repo", default="bench/repo", help="Repository name queried.")
+    parser.add_argument("--scenario", action="append", choices=list(scenarios),
+                        help="Commands to run, may be repeated (default: all).")
+    parser.add_argument("--output", default=default_output,
+                        help="Json file the results are written to (default: benchmarks/benchmark-results.json).")
+    args = parser.parse_args()
+
+    server = MockServer(0, args.latency, args.months, args.detail).start()
+    env = dict(os.environ, OPENDIGGER_PREFIX=server.prefix, PYTHONPATH=root)
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"runs": args.runs, "latency": args.latency, "months": args.months, "detail": args.detail},
+        "scenarios": {},
+    }
+    print(f"{'scenario':<12} {'median':>10} {'min':>10} {'requests':>9} {'peak rss':>10} {'charts':>7}")
+    for name in args.scenario or scenarios:
+        command = ["-repo", args.repo] + scenarios[name] + ["--no-cache"]
+        result = results["scenarios"][name] = run_scenario(command, env, server, args.runs)
+        print(f"{name:<12} {result['median_seconds'] * 1000:8.1f}ms {result['min_seconds'] * 1000:8.1f}ms "
+              f"{result['requests']:>9} {result['peak_rss_bytes'] / 2 ** 20:8.1f}MB {result['charts']:>7}")
+    results["chart_render_seconds"] = chart_render_time(args.months, args.runs)
+    print(f"{'chart':<12} {results['chart_render_seconds'] * 1000:8.1f}ms per line chart of {args.months} months")
+    server.shutdown()
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
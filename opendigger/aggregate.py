@@ -0,0 +1,106 @@
+import warnings
+
+import numpy as np
+
+from .series import month_key
+
+percentiles = [25, 50, 75, 90]
+
+
+# Aligns the series of many repositories on one month axis: returns the month
+# ordinals and a repos x months float64 matrix, nan where a repo has no value.
+def align(series_list):
+    present = [series for series in series_list if series is not None and len(series) > 0]
+    if not present:
+        return np.zeros(0, dtype=np.int64), np.full((len(series_list), 0), np.nan)
+    start = min(int(series.months[0]) for series in present)
+    end = max(int(series.months[-1]) for series in present)
+    matrix = np.full((len(series_list), end - start + 1), np.nan)
+    for row, series in enumerate(series_list):
+        if series is not None and len(series) > 0:
+            matrix[row, series.months - start] = series.values
+    return np.arange(start, end + 1, dtype=np.int64), matrix
+
+
+# trailing moving average over `window` months along each row, ignoring missing months
+def moving_average(matrix, window):
+    valid = ~np.isnan(matrix)
+    sums = np.concatenate([np.zeros((matrix.shape[0], 1)), np.cumsum(np.where(valid, matrix, 0), axis=1)], axis=1)
+    counts = np.concatenate([np.zeros((matrix.shape[0], 1)), np.cumsum(valid, axis=1)], axis=1)
+    window = max(min(window, matrix.shape[1]), 1)
+    window_sums = sums[:, window:] - sums[:, :-window]
+    window_counts = counts[:, window:] - counts[:, :-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        averages = window_sums / window_counts
+    # the first window - 1 months have no complete window
+    return np.concatenate([np.full((matrix.shape[0], window - 1), np.nan), averages], axis=1)
+
+
+# per repo statistics over the last `months` columns of the aligned matrix,
+# growth compares the latest month with the month before that window
+def summarize(matrix, months, window):
+    if matrix.shape[1] == 0:
+        # no repo has any month
+        missing = np.full(len(matrix), np.nan)
+        return {score: missing.copy() for score in ["growth", "growth-rate", "mean", "latest", "moving-average"]}
+    baseline = matrix[:, -months - 1:] if months > 0 else matrix
+    recent = matrix[:, -months:] if months > 0 else matrix
+    first = baseline[:, 0]
+    latest = baseline[:, -1]
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        # repos without data in the window give nan, not a warning
+        warnings.simplefilter("ignore", RuntimeWarning)
+        growth = latest - first
+        growth_rate = np.where(first != 0, growth / np.abs(first) * 100, np.nan)
+        mean = np.nanmean(recent, axis=1) if recent.shape[1] else np.full(len(matrix), np.nan)
+    averages = moving_average(matrix, window)
+    return {
+        "growth": growth,
+        "growth-rate": growth_rate,
+        "mean": mean,
+        "latest": latest,
+        "moving-average": averages[:, -1] if averages.shape[1] else np.full(len(matrix), np.nan),
+    }
+
+
+# indexes of the k largest values, largest first; repos without a value are left out.
+# Only the k selected values are sorted.
+def top_k(values, k):
+    rows = np.flatnonzero(~np.isnan(values))
+    k = min(k, len(rows))
+    if k <= 0:
+        return []
+    candidates = values[rows]
+    best = np.argpartition(-candidates, k - 1)[:k]
+    best = best[np.lexsort((rows[best], -candidates[best]))]
+    return rows[best].tolist()
+
+
+# percentiles across repositories for every month: percentiles x months
+def portfolio_percentiles(matrix, q=percentiles):
+    if matrix.size == 0:
+        return np.full((len(q), matrix.shape[1]), np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanpercentile(matrix, q, axis=0)
+
+
+def format_number(value):
+    return "-" if np.isnan(value) else f"{value:.2f}"
+
+
+def print_ranking(repos, stats, by, top, index_name, months, window):
+    print(f"Top {top} repositories by {index_name} {by} over the last {months} months:")
+    print(f"\t{'rank':<5} {'repo':<40} {by:>15} {'latest':>12} {f'ma{window}':>12} {'growth':>12}")
+    for rank, row in enumerate(top_k(stats[by], top), start=1):
+        print(f"\t{rank:<5} {repos[row]:<40} {format_number(stats[by][row]):>15} "
+              f"{format_number(stats['latest'][row]):>12} {format_number(stats['moving-average'][row]):>12} "
+              f"{format_number(stats['growth'][row]):>12}")
+
+
+def print_portfolio(month_axis, matrix, index_name, months):
+    print(f"\nPortfolio {index_name} percentiles across {len(matrix)} repositories:")
+    print(f"\t{'month':<8} " + " ".join(f"{f'p{q}':>10}" for q in percentiles))
+    table = portfolio_percentiles(matrix[:, -months:] if months > 0 else matrix)
+    for column, ordinal in enumerate(month_axis[-months:].tolist() if months > 0 else month_axis.tolist()):
+        print(f"\t{month_key(ordinal):<8} " + " ".join(f"{format_number(v):>10}" for v in table[:, column]))
@@ -0,0 +1,86 @@
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .fetch import prefetch, take_failures, default_workers
+
+default_concurrency = 4
+
+
+def read_repo_list(path):
+    # one <owner>/<repo> per line, blank lines and # comments are skipped
+    if path == "-":
+        lines = sys.stdin.readlines()
+    else:
+        with open(path, "r") as f:
+            lines = f.readlines()
+    repos = []
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if line:
+            repos.append(line)
+    return repos
+
+
+# Process a list of repositories in one run. Downloads for the next `concurrency`
+# repositories run in the background while the current one is displayed, and a
+# failing repository is reported without stopping the others.
+def run_batch(open_digger, repos, index, metric, month=None, download_type=None, concurrency=default_concurrency,
+              workers=default_workers, report=None):
+    start = time.time()
+    succeeded = []
+    failed = {}
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        pending = deque()
+        upcoming = iter(repos)
+
+        def schedule():
+            for repo_name in upcoming:
+                urls = open_digger.plan_urls(repo_name, index, metric, month)
+                pending.append((repo_name, pool.submit(prefetch, urls, workers)))
+                if len(pending) > concurrency:
+                    break
+
+        schedule()
+        while pending:
+            repo_name, future = pending.popleft()
+            schedule()
+            print(f"\n[{len(succeeded) + len(failed) + 1}/{len(repos)}] {repo_name}")
+            try:
+                future.result()
+                open_digger.run_repo(repo_name, index, metric, month, download_type, workers, report)
+                error = repo_error(open_digger, repo_name, index, metric, month)
+            except Exception as e:
+                take_failures(open_digger.repo_prefix(repo_name))
+                error = f"{type(e).__name__}: {e}"
+            if error is None:
+                succeeded.append(repo_name)
+            else:
+                failed[repo_name] = error
+                print(f"Failed to process {repo_name}: {error}")
+    print_summary(succeeded, failed, time.time() - start)
+    return succeeded, failed
+
+
+# Why the report of a repository just processed is missing data, None when it is not:
+# downloads that failed, or not one of its files found on the server (404). Takes
+# the download failures of the repository, so they do not pile up over a batch.
+def repo_error(open_digger, repo_name, index, metric, month=None):
+    taken = take_failures(open_digger.repo_prefix(repo_name))
+    errors = [error for status, error in taken.values() if status != 404]
+    if errors:
+        return f"{len(errors)} downloads failed, first: {errors[0]}"
+    planned = open_digger.plan_urls(repo_name, index, metric, month)
+    if planned and len(taken) >= len(planned):
+        return f"no data: all {len(taken)} files were not found"
+    return None
+
+
+def print_summary(succeeded, failed, elapsed):
+    total = len(succeeded) + len(failed)
+    print(f"\nBatch summary: {len(succeeded)}/{total} repositories succeeded in {elapsed:.1f}s")
+    if failed:
+        print("Failed repositories:")
+        for repo_name, error in failed.items():
+            print(f"\t{repo_name}: {error}")
@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import re
+import hashlib
+import threading
+
+# OpenDigger publishes new data once a month, so a day old response is still good
+cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "opendigger")
+default_ttl = 24 * 60 * 60
+default_max_size = 256 * 1024 * 1024
+suffix_body = ".json"
+suffix_meta = ".meta"
+suffix_index = ".idx"
+suffix_tmp = ".tmp"
+
+
+# On-disk response cache, one body + one metadata file per url.
+# Entries are addressed by the sha256 of the url and evicted least recently used
+# first (the body mtime is bumped on every read) once max_size bytes is exceeded.
+# Bodies that are a {"YYYY-MM": value} object also get an index of the byte range
+# of every month, so a single month is read and parsed without loading the file.
+class ResponseCache:
+    def __init__(self, path=cache_dir, ttl=default_ttl, max_size=default_max_size):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.size = None
+        self.lock = threading.Lock()
+
+    def entry_paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        folder = os.path.join(self.path, key[:2])
+        return os.path.join(folder, key + suffix_body), os.path.join(folder, key + suffix_meta)
+
+    def read_meta(self, url):
+        _, meta_path = self.entry_paths(url)
+        try:
+            with open(meta_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def lookup(self, url):
+        body_path, meta_path = self.entry_paths(url)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+            os.utime(body_path)
+        except (OSError, ValueError):
+            return None, None
+        return body, meta
+
+    def is_fresh(self, meta):
+        return time.time() - meta.get("fetched", 0) < self.ttl
+
+    # (found, value) of one month of a cached entry; found is False when the
+    # entry is missing or not indexed and the whole file has to be loaded
+    def read_month(self, url, month):
+        body_path, _ = self.entry_paths(url)
+        try:
+            with open(index_path(body_path), "r") as f:
+                index = json.load(f)
+            if month not in index:
+                return True, None
+            start, end = index[month]
+            with open(body_path, "rb") as f:
+                f.seek(start)
+                data = f.read(end - start)
+            os.utime(body_path)
+            return True, json.loads(data)
+        except (OSError, ValueError):
+            return False, None
+
+    def put(self, url, body, etag=None, last_modified=None):
+        tmp_path = self.temp_path(url)
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        self.put_file(url, tmp_path, month_offsets(body), etag, last_modified)
+
+    # temporary file a body can be streamed to before put_file moves it in place
+    def temp_path(self, url):
+        body_path, _ = self.entry_paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        return temp_path(body_path)
+
+    # stores a body already written to tmp_path, with its month index (or None)
+    def put_file(self, url, tmp_path, offsets, etag=None, last_modified=None):
+        body_path, meta_path = self.entry_paths(url)
+        old_size = os.path.getsize(body_path) if os.path.exists(body_path) else 0
+        size = os.path.getsize(tmp_path)
+        meta = {"url": url, "fetched": time.time(), "size": size,
+                "etag": etag, "last_modified": last_modified}
+        os.replace(tmp_path, body_path)
+        if offsets is not None:
+            write_atomic(index_path(body_path), json.dumps(offsets).encode("utf-8"))
+        else:
+            remove_files(index_path(body_path))
+        write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+        with self.lock:
+            if self.size is not None:
+                self.size += size - old_size
+            self.evict()
+
+    # the server confirmed the cached body is still current (304)
+    def touch(self, url, meta):
+        _, meta_path = self.entry_paths(url)
+        meta["fetched"] = time.time()
+        try:
+            write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+        except OSError:
+            pass
+
+    def discard(self, url):
+        body_path, _ = self.entry_paths(url)
+        with self.lock:
+            if self.size is not None and os.path.exists(body_path):
+                self.size -= os.path.getsize(body_path)
+            remove_entry(body_path)
+
+    def entries(self):
+        # (last access, size, body path) for every cached body
+        result = []
+        if not os.path.isdir(self.path):
+            return result
+        for folder in os.scandir(self.path):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.name.endswith(suffix_body):
+                    stat = entry.stat()
+                    result.append((stat.st_mtime, stat.st_size, entry.path))
+        return result
+
+    def evict(self):
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.entries())
+        if self.size <= self.max_size:
+            return
+        for _, size, body_path in sorted(self.entries()):
+            if self.size <= self.max_size:
+                break
+            remove_entry(body_path)
+            self.size -= size
+
+
+def index_path(body_path):
+    return body_path[:-len(suffix_body)] + suffix_index
+
+
+def remove_entry(body_path):
+    entry = body_path[:-len(suffix_body)]
+    remove_files(body_path, entry + suffix_meta, entry + suffix_index)
+
+
+def remove_files(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# {key: [start, end]} byte range of every value of a top-level json object, or None.
+# The body is decoded as latin-1 so string positions are byte offsets; multi-byte
+# utf-8 characters only ever appear inside strings and don't change the structure.
+def month_offsets(body):
+    text = body.decode("latin-1")
+    try:
+        i = skip_whitespace(text, 0)
+        if text[i] != "{":
+            return None
+        i = skip_whitespace(text, i + 1)
+        offsets = {}
+        if text[i] == "}":
+            return offsets
+        while True:
+            key, i = json_decoder.raw_decode(text, i)
+            i = skip_whitespace(text, i)
+            if text[i] != ":":
+                return None
+            start = skip_whitespace(text, i + 1)
+            _, end = json_decoder.raw_decode(text, start)
+            offsets[key] = [start, end]
+            i = skip_whitespace(text, end)
+            if text[i] == "}":
+                return offsets
+            if text[i] != ",":
+                return None
+            i = skip_whitespace(text, i + 1)
+    except (ValueError, IndexError):
+        return None
+
+
+json_decoder = json.JSONDecoder()
+whitespace = re.compile(r"[ \t\n\r]*")
+
+
+def skip_whitespace(text, i):
+    return whitespace.match(text, i).end()
+
+
+# headers asking the server to answer 304 if the cached body is still current
+def conditional_headers(meta):
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+# hit/304/200 counters for one run
+class CacheStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.not_modified = 0
+        self.downloaded = 0
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+
+    def record(self, status, size):
+        with self.lock:
+            if status == "hit":
+                self.hits += 1
+                self.bytes_saved += size
+            elif status == "not_modified":
+                self.not_modified += 1
+                self.bytes_saved += size
+            else:
+                self.downloaded += 1
+                self.bytes_downloaded += size
+
+    def summary(self):
+        return (f"Cache: {self.hits} hits, {self.not_modified} not modified (304), "
+                f"{self.downloaded} downloaded (200), {format_size(self.bytes_saved)} saved, "
+                f"{format_size(self.bytes_downloaded)} transferred")
+
+
+def format_size(size):
+    if size < 1024:
+        return f"{size} B"
+    for unit in ["KB", "MB", "GB"]:
+        size /= 1024
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}"
+
+
+def temp_path(path):
+    # unique per writer so concurrent fetches of the same url never share a temp file
+    return f"{path}.{os.getpid()}.{threading.get_ident()}{suffix_tmp}"
+
+
+def write_atomic(path, data):
+    tmp_path = temp_path(path)
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
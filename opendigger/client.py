@@ -0,0 +1,195 @@
+import zlib
+import threading
+import http.client
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit, urljoin
+
+default_pool_size = 8
+default_timeout = 30
+max_redirects = 5
+default_chunk_size = 64 * 1024
+redirect_codes = (301, 302, 303, 307, 308)
+
+# errors raised when the server already closed an idle keep-alive connection
+stale_connection_errors = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                           ConnectionResetError, BrokenPipeError)
+
+
+class Response:
+    def __init__(self, status, reason, headers, body, size):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        # bytes received on the wire, before decompression
+        self.size = size
+
+    def read(self):
+        return self.body
+
+
+# Body of a response read in chunks and decompressed on the fly. The connection
+# goes back to the pool when the body was read to the end, a stream closed early
+# closes its connection instead.
+class StreamResponse:
+    def __init__(self, client, key, connection, response, slots):
+        self.client = client
+        self.key = key
+        self.connection = connection
+        self.response = response
+        self.slots = slots
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        # bytes received on the wire, before decompression
+        self.size = 0
+        self.closed = False
+        encoding = response.getheader("Content-Encoding", "").lower()
+        if encoding == "gzip":
+            self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self.decompressor = zlib.decompressobj()
+        else:
+            self.decompressor = None
+
+    def chunks(self, size=default_chunk_size):
+        try:
+            while True:
+                data = self.response.read(size)
+                if not data:
+                    break
+                self.size += len(data)
+                if self.decompressor is not None:
+                    data = self.decompressor.decompress(data)
+                if data:
+                    yield data
+            if self.decompressor is not None:
+                tail = self.decompressor.flush()
+                if tail:
+                    yield tail
+        except (OSError, http.client.HTTPException, zlib.error) as e:
+            self.connection.close()
+            raise urllib.error.URLError(e)
+
+    def read(self):
+        return b"".join(self.chunks())
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.client.release(self.key, self.connection, self.response.isclosed() and not self.response.will_close)
+        self.slots.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Keep-alive HTTP client shared by every download. Each host gets up to
+# pool_size persistent connections, so a run pays the TCP+TLS handshake once
+# per connection instead of once per file. Failures are raised as
+# urllib.error.HTTPError / URLError like urllib.request.urlopen does.
+class HTTPClient:
+    def __init__(self, pool_size=default_pool_size, timeout=default_timeout):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.slots = {}
+
+    def host_slots(self, key):
+        with self.lock:
+            if key not in self.slots:
+                self.slots[key] = threading.BoundedSemaphore(self.pool_size)
+                self.idle[key] = []
+            return self.slots[key]
+
+    def new_connection(self, scheme, host, port):
+        connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        proxy = urllib.request.getproxies().get(scheme)
+        if proxy and not urllib.request.proxy_bypass(host):
+            proxy_url = urlsplit(proxy)
+            proxy_class = http.client.HTTPSConnection if proxy_url.scheme == "https" else http.client.HTTPConnection
+            if scheme == "https":
+                connection = proxy_class(proxy_url.hostname, proxy_url.port, timeout=self.timeout)
+                connection.set_tunnel(host, port)
+                return connection
+            return proxy_class(proxy_url.hostname, proxy_url.port, timeout=self.timeout)
+        return connection_class(host, port, timeout=self.timeout)
+
+    def get(self, url, headers=None, redirects=max_redirects):
+        with self.open(url, headers, redirects) as stream:
+            body = stream.read()
+        return Response(stream.status, stream.reason, stream.headers, body, stream.size)
+
+    # Sends the request and checks the status; the body is read from the returned
+    # StreamResponse, which holds the connection until it is closed.
+    def open(self, url, headers=None, redirects=max_redirects):
+        parts = urlsplit(url)
+        scheme = parts.scheme
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path + ("?" + parts.query if parts.query else "")
+        # plain http through a proxy needs the absolute url as request target
+        if scheme == "http" and urllib.request.getproxies().get(scheme) \
+                and not urllib.request.proxy_bypass(parts.hostname):
+            path = url
+        request_headers = {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive",
+                           "User-Agent": "opendigger-cli"}
+        request_headers.update(headers or {})
+
+        slots = self.host_slots(key)
+        slots.acquire()
+        connection, reused = self.checkout(key)
+        try:
+            try:
+                response = self.send(connection, path, request_headers)
+            except stale_connection_errors:
+                if not reused:
+                    raise
+                connection.close()
+                connection = self.new_connection(*key)
+                response = self.send(connection, path, request_headers)
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            slots.release()
+            raise urllib.error.URLError(e)
+        stream = StreamResponse(self, key, connection, response, slots)
+        location = response.getheader("Location")
+        if response.status in redirect_codes and location and redirects > 0:
+            stream.read()
+            stream.close()
+            return self.open(urljoin(url, location), headers, redirects - 1)
+        if response.status >= 300:
+            stream.read()
+            stream.close()
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+        return stream
+
+    def release(self, key, connection, reusable):
+        if reusable:
+            with self.lock:
+                self.idle[key].append(connection)
+        else:
+            connection.close()
+
+    def checkout(self, key):
+        with self.lock:
+            if self.idle[key]:
+                return self.idle[key].pop(), True
+        return self.new_connection(*key), False
+
+    def send(self, connection, path, headers):
+        connection.request("GET", path, headers=headers)
+        return connection.getresponse()
+
+    def close(self):
+        with self.lock:
+            for connections in self.idle.values():
+                for connection in connections:
+                    connection.close()
+                connections.clear()
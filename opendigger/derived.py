@@ -0,0 +1,140 @@
+import warnings
+
+import numpy as np
+
+from .aggregate import align, format_number
+from .series import Series, parse_month, month_key
+
+default_window = 3
+# quantile_0 .. quantile_4 of the distribution files: minimum, quartiles and maximum
+quantile_count = 5
+median_quantile = 2
+
+
+# One response time / resolution duration / age file ({"avg": {...}, "levels": {...},
+# "quantile_0": {...}, ...}) loaded once into arrays on a shared month axis: the
+# average, a months x levels matrix of issue/PR counts per duration bucket and a
+# months x 5 matrix of quantiles, nan where the file has no value.
+class Distribution:
+    def __init__(self, months, avg, levels, quantiles):
+        self.months = months
+        self.avg = avg
+        self.levels = levels
+        self.quantiles = quantiles
+
+    @classmethod
+    def from_json(cls, data):
+        if not isinstance(data, dict) or not isinstance(data.get("avg"), dict):
+            return None
+        parts = [data.get("avg") or {}, data.get("levels") or {}] + \
+                [data.get(f"quantile_{q}") or {} for q in range(quantile_count)]
+        keys = sorted({key for part in parts for key in part if parse_month(key) is not None})
+        months = np.asarray([parse_month(key) for key in keys], dtype=np.int64)
+        width = max((len(value) for value in parts[1].values() if isinstance(value, list)), default=0)
+        levels = month_rows(parts[1], keys, width)
+        quantiles = np.column_stack([month_rows(part, keys, 1)[:, 0] for part in parts[2:]]) if keys else \
+            np.zeros((0, quantile_count))
+        return cls(months, month_rows(parts[0], keys, 1)[:, 0], levels, quantiles)
+
+    def __len__(self):
+        return len(self.months)
+
+    def keys(self):
+        return [month_key(ordinal) for ordinal in self.months.tolist()]
+
+    @property
+    def median(self):
+        return self.quantiles[:, median_quantile]
+
+    def series(self, values):
+        return Series(self.months, values)
+
+    # bottom of every level in a stacked bar chart of the levels
+    def stacks(self):
+        return cumulative_stacks(self.levels)
+
+
+# months x width matrix of a {"YYYY-MM": number or list} part, nan where missing
+def month_rows(part, keys, width):
+    rows = np.full((len(keys), width), np.nan)
+    for row, key in enumerate(keys):
+        value = part.get(key)
+        if isinstance(value, list):
+            rows[row, :min(len(value), width)] = [np.nan if v is None else v for v in value[:width]]
+        elif value is not None and width:
+            rows[row, 0] = value
+    return rows
+
+
+# bottom of each column when the columns of every row are stacked, missing values count as 0
+def cumulative_stacks(levels):
+    heights = np.nan_to_num(levels)
+    return np.cumsum(heights, axis=1) - heights
+
+
+# trailing median over `window` months, ignoring missing months; the first window - 1 months are nan
+def rolling_median(values, window=default_window):
+    window = max(min(window, len(values)), 1)
+    if len(values) == 0:
+        return values.copy()
+    with warnings.catch_warnings():
+        # windows without any value give nan, not a warning
+        warnings.simplefilter("ignore", RuntimeWarning)
+        medians = np.nanmedian(np.lib.stride_tricks.sliding_window_view(values, window), axis=1)
+    return np.concatenate([np.full(window - 1, np.nan), medians])
+
+
+# change from the previous month, nan for the first month
+def deltas(values):
+    if len(values) == 0:
+        return values.copy()
+    return np.concatenate([[np.nan], np.diff(values)])
+
+
+def ratios(numerator, denominator):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
+
+
+# Derived metrics of issues or PRs, each a Series on the same month axis: opened and
+# closed counts, their ratio, the monthly change of opened, the median response time
+# with its rolling median over `window` months and the median resolution duration
+# with its monthly change. `response` / `resolution` are Distributions or None.
+def derive(opened, closed, response, resolution, window=default_window):
+    missing = Series(np.zeros(0, dtype=np.int64), np.zeros(0))
+    month_axis, matrix = align([
+        opened, closed,
+        response.series(response.median) if response is not None else missing,
+        resolution.series(resolution.median) if resolution is not None else missing,
+    ])
+    opened_values, closed_values, response_median, resolution_median = matrix
+    columns = {
+        "opened": opened_values,
+        "closed": closed_values,
+        "closed/opened": ratios(closed_values, opened_values),
+        "Δ opened": deltas(opened_values),
+        "response median": response_median,
+        f"response {window}m median": rolling_median(response_median, window),
+        "resolution median": resolution_median,
+        "Δ resolution": deltas(resolution_median),
+    }
+    return {name: Series(month_axis, values) for name, values in columns.items()}
+
+
+def print_derived(title, columns):
+    names = list(columns)
+    widths = [max(len(name), 8) for name in names]
+    print(f"{title} derived metrics:")
+    print(f"\t{'month':<8} " + " ".join(f"{name:>{width}}" for name, width in zip(names, widths)))
+    for row, key in enumerate(columns[names[0]].keys()):
+        print(f"\t{key:<8} " + " ".join(f"{format_number(columns[name].values[row]):>{width}}"
+                                         for name, width in zip(names, widths)))
+
+
+def markdown_derived(title, columns):
+    names = list(columns)
+    lines = [f"###  {title} derived metrics\n", "| month | " + " | ".join(names) + " |\n",
+             "| --- |" + " --- |" * len(names) + "\n"]
+    for row, key in enumerate(columns[names[0]].keys()):
+        lines.append(f"| {key} | " + " | ".join(format_number(columns[name].values[row]) for name in names) + " |\n")
+    return "".join(lines)
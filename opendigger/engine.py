@@ -0,0 +1,146 @@
+import time
+import json
+import random
+import socket
+import asyncio
+import threading
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+default_rate = 0
+default_retries = 3
+default_backoff = 0.5
+max_backoff = 30
+
+
+# outcome of one url: data on success, otherwise a printable error
+class FetchResult:
+    def __init__(self, url, data=None, error=None, status=None, attempts=1):
+        self.url = url
+        self.data = data
+        self.error = error
+        self.status = status
+        self.attempts = attempts
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+# Requests per second shared by every thread of a run (0 = no limit). Each caller
+# reserves the next free slot and sleeps until it, allowing bursts of `burst`
+# requests (generic cell rate algorithm). Only requests sent to the server wait,
+# cache hits and snapshot reads are not limited.
+class RateLimiter:
+    def __init__(self, rate=default_rate, burst=1):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.tolerance = self.interval * (max(burst, 1) - 1)
+        self.lock = threading.Lock()
+        self.next_time = 0
+
+    def reserve(self):
+        if not self.interval:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            arrival = max(self.next_time, now)
+            self.next_time = arrival + self.interval
+            return max(0, arrival - self.tolerance - now)
+
+    def wait(self):
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+
+# socket.timeout is only an alias of the builtin TimeoutError from Python 3.10 on
+timeout_errors = (socket.timeout, TimeoutError)
+
+
+def is_retryable(e):
+    if isinstance(e, urllib.error.HTTPError):
+        return e.code >= 500 or e.code == 429
+    return isinstance(e, (urllib.error.URLError, ConnectionError) + timeout_errors)
+
+
+def describe_error(url, e):
+    if isinstance(e, urllib.error.HTTPError):
+        return f"HTTPError: {e.code} - {url} {e.reason}"
+    if isinstance(e, urllib.error.URLError):
+        return f"URLError: {e.reason}"
+    if isinstance(e, timeout_errors):
+        return f"TimeoutError: {url}"
+    if isinstance(e, json.JSONDecodeError):
+        return f"JSONDecodeError: {e.msg}"
+    return f"An unexpected error occurred: {e}"
+
+
+# asyncio fetch core: `load` is a blocking function returning the parsed json of a
+# url (or raising), it runs on a bounded thread pool while the event loop applies
+# exponential backoff retries for 5xx, 429 and network errors. `load` calls
+# limiter.wait() before it sends a request, and the socket timeout of the HTTP
+# client bounds the request itself, so time spent waiting for a worker or a rate
+# slot never counts as a timeout. The pool is shared by every fetch_all of a run
+# (the prefetches of a -repos-file batch included), so at most `workers` loads run
+# at once however many are queued. Single urls are loaded on the calling thread.
+# Failures come back as FetchResult errors, never raise.
+class FetchEngine:
+    def __init__(self, load, rate=default_rate, retries=default_retries, backoff=default_backoff, workers=8):
+        self.load = load
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    # `load` replaces the engine's load function for this url
+    async def fetch_async(self, url, load=None):
+        load = load or self.load
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                data = await loop.run_in_executor(self.executor, load, url)
+                return FetchResult(url, data, attempts=attempt)
+            except Exception as e:
+                if attempt > self.retries or not is_retryable(e):
+                    return self.failed(url, e, attempt)
+            await asyncio.sleep(self.retry_delay(attempt))
+
+    def failed(self, url, e, attempt):
+        return FetchResult(url, error=describe_error(url, e), status=getattr(e, "code", None), attempts=attempt)
+
+    def retry_delay(self, attempt):
+        delay = min(self.backoff * 2 ** (attempt - 1), max_backoff)
+        return delay * random.uniform(0.5, 1.5)
+
+    async def fetch_all_async(self, urls, concurrency):
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def bounded(url):
+            async with semaphore:
+                return await self.fetch_async(url)
+
+        return await asyncio.gather(*[bounded(url) for url in urls])
+
+    # same as fetch_async for one url, on the calling thread
+    def fetch(self, url, load=None):
+        load = load or self.load
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                data = load(url)
+                return FetchResult(url, data, attempts=attempt)
+            except Exception as e:
+                if attempt > self.retries or not is_retryable(e):
+                    return self.failed(url, e, attempt)
+            time.sleep(self.retry_delay(attempt))
+
+    def fetch_all(self, urls, concurrency=8):
+        if not urls:
+            return []
+        return asyncio.run(self.fetch_all_async(urls, concurrency))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
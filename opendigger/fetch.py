@@ -0,0 +1,319 @@
+import json
+import threading
+import urllib.error
+from concurrent.futures import Future
+
+from .cache import CacheStats, conditional_headers, remove_files
+from .client import HTTPClient
+from .engine import FetchEngine
+from .timing import span
+from .stream import iter_members, find_member
+
+default_workers = 8
+
+# on-disk response cache, configured by OpenDigger.run (None disables caching)
+response_cache = None
+refresh_cache = False
+cache_stats = CacheStats()
+# pooled keep-alive connections shared by every download
+http_client = HTTPClient()
+# offline snapshot every file is read from instead of the network (None = use the network)
+snapshot = None
+# url -> (status, error) of the failed downloads, taken per repository by the
+# -repos-file runs to tell which reports are missing data
+failures = {}
+failures_lock = threading.Lock()
+
+
+def set_http_client(client):
+    global http_client
+    http_client.close()
+    http_client = client
+
+
+def set_fetch_engine(engine):
+    global fetch_engine
+    fetch_engine.close()
+    fetch_engine = engine
+
+
+def set_snapshot(bundle):
+    global snapshot
+    if snapshot is not None:
+        snapshot.close()
+    snapshot = bundle
+
+
+def set_response_cache(cache, refresh=False):
+    global response_cache, refresh_cache, cache_stats
+    response_cache = cache
+    refresh_cache = refresh
+    cache_stats = CacheStats()
+
+
+def load_cached_json(url, data):
+    try:
+        with span("parse", url):
+            return json.loads(data)
+    except json.JSONDecodeError:
+        response_cache.discard(url)
+    return None
+
+
+def get_url_json(url):
+    return memo.get(url, download_json)
+
+
+# blocking load of one url through the cache, raises on failure; `revalidate` asks
+# the server whether a cached entry changed even when it is still fresh
+def load_json(url, revalidate=False):
+    if snapshot is not None:
+        return snapshot.load_json(url)
+    cached, meta = None, None
+    if response_cache is not None:
+        with span("cache", url, status="miss") as event:
+            cached, meta = response_cache.lookup(url)
+            fresh = cached is not None and not (refresh_cache or revalidate) and response_cache.is_fresh(meta)
+            if cached is not None:
+                event.update(status="hit" if fresh else "stale", bytes=len(cached))
+        if fresh:
+            json_data = load_cached_json(url, cached)
+            if json_data is not None:
+                cache_stats.record("hit", len(cached))
+                return json_data
+            cached = None
+    # stale or refreshed entries are revalidated, the body is only sent again if it changed
+    headers = conditional_headers(meta) if cached is not None else {}
+    fetch_engine.limiter.wait()
+    with span("fetch", url) as event:
+        try:
+            response = http_client.get(url, headers)
+            event.update(status="downloaded", bytes=response.size)
+        except urllib.error.HTTPError as e:
+            event["status"] = "not modified" if e.code == 304 else f"HTTP {e.code}"
+            json_data = load_cached_json(url, cached) if e.code == 304 and cached is not None else None
+            if json_data is None:
+                raise
+    if event["status"] == "not modified":
+        response_cache.touch(url, meta)
+        cache_stats.record("not_modified", len(cached))
+        return json_data
+    data = response.read()
+    with span("parse", url):
+        json_data = json.loads(data)
+    if response_cache is not None:
+        with span("write", url, bytes=len(data)):
+            response_cache.put(url, data, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    cache_stats.record("downloaded", response.size)
+    return json_data
+
+
+# Blocking load of one month of a url, raises on failure. The body is parsed member
+# by member as it arrives and without a cache the download stops at the month, so
+# memory stays flat however long the history is; with a cache the rest of the body
+# is streamed to the cache file together with its month index.
+def load_month(url, month):
+    meta = response_cache.read_meta(url) if response_cache is not None else None
+    headers = conditional_headers(meta) if meta is not None else {}
+    fetch_engine.limiter.wait()
+    with span("fetch", url, month=month) as event:
+        try:
+            stream = http_client.open(url, headers)
+        except urllib.error.HTTPError as e:
+            event["status"] = "not modified" if e.code == 304 else f"HTTP {e.code}"
+            if e.code != 304 or meta is None:
+                raise
+            stream, not_modified = None, e
+        if stream is None:
+            found, value = response_cache.read_month(url, month)
+            if not found:
+                # entry without a month index, the whole body is parsed
+                cached, _ = response_cache.lookup(url)
+                json_data = load_cached_json(url, cached) if cached is not None else None
+                if not isinstance(json_data, dict):
+                    raise not_modified
+                value = json_data.get(month)
+            response_cache.touch(url, meta)
+            cache_stats.record("not_modified", meta.get("size", 0))
+            return value
+        with stream:
+            if response_cache is None:
+                found, value = find_member(stream.chunks(), month)
+            else:
+                found, value = cache_month(url, month, stream)
+            event.update(status="streamed", bytes=stream.size)
+    cache_stats.record("downloaded", stream.size)
+    return value
+
+
+# reads the whole stream into the cache, returning (found, value) of the month on the way
+def cache_month(url, month, stream):
+    tmp_path = response_cache.temp_path(url)
+    found, value, offsets = False, None, {}
+    try:
+        with open(tmp_path, "wb") as f:
+            for key, member, start, end in iter_members(tee(stream.chunks(), f)):
+                offsets[key] = [start, end]
+                if key == month:
+                    found, value = True, member
+        response_cache.put_file(url, tmp_path, offsets, stream.headers.get("ETag"), stream.headers.get("Last-Modified"))
+    except BaseException:
+        remove_files(tmp_path)
+        raise
+    return found, value
+
+
+def tee(chunks, f):
+    for chunk in chunks:
+        f.write(chunk)
+        yield chunk
+
+
+def report_failure(result):
+    print(result.error)
+    with failures_lock:
+        failures[result.url] = (result.status, result.error)
+
+
+# failures of the urls starting with url_prefix, removed from failures
+def take_failures(url_prefix):
+    with failures_lock:
+        taken = {url: failure for url, failure in failures.items() if url.startswith(url_prefix)}
+        for url in taken:
+            del failures[url]
+    return taken
+
+
+# load with retries, errors are printed and give None
+def download_json(url):
+    result = fetch_engine.fetch(url)
+    if not result.ok:
+        report_failure(result)
+    return result.data
+
+
+# retrying fetch engine used for every download, configured by OpenDigger.run
+fetch_engine = FetchEngine(load_json)
+
+
+# `stream`: a month of a file with large values per month (not prefetched) is parsed
+# while it downloads instead of loading the whole history
+def get_json_data(url, month, stream=False):
+    # a single month is read from the cache's month index instead of parsing the whole history
+    meta = fresh_meta(url) if month is not None and url not in memo else None
+    if meta is not None:
+        with span("cache", url, status="month index", month=month):
+            found, value = response_cache.read_month(url, month)
+        if found:
+            cache_stats.record("hit", meta.get("size", 0))
+            return value
+    if stream and month is not None and url not in memo and snapshot is None:
+        result = fetch_engine.fetch(url, lambda url: load_month(url, month))
+        if not result.ok:
+            report_failure(result)
+        return result.data
+    json_data = get_url_json(url)
+    if json_data is None or month is None:
+        return json_data
+    return json_data.get(month)
+
+
+# Per-run single-flight memo: every url is loaded once, callers asking while the
+# download is in flight wait for it, and all callers share the parsed object.
+# Requests for a url that was already used are counted as absorbed duplicates;
+# prefetch warms the memo without counting as a use.
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.results = {}
+        self.used = set()
+        self.loaded = 0
+        self.absorbed = 0
+
+    def __contains__(self, url):
+        return url in self.results
+
+    # (future, owner): the owner has to resolve the future with the loaded value
+    def claim(self, url, warm=False):
+        with self.lock:
+            future = self.results.get(url)
+            owner = future is None
+            if owner:
+                future = self.results[url] = Future()
+                self.loaded += 1
+            if not warm:
+                if url in self.used:
+                    self.absorbed += 1
+                self.used.add(url)
+        return future, owner
+
+    def get(self, url, load):
+        future, owner = self.claim(url)
+        if owner:
+            try:
+                future.set_result(load(url))
+            except BaseException as e:
+                future.set_exception(e)
+        return future.result()
+
+    def forget_prefix(self, url_prefix):
+        with self.lock:
+            for url in [url for url in self.results if url.startswith(url_prefix)]:
+                del self.results[url]
+                self.used.discard(url)
+
+    def summary(self):
+        return f"Requests: {self.loaded} unique urls loaded, {self.absorbed} duplicate fetches absorbed"
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+            self.used.clear()
+            self.loaded = 0
+            self.absorbed = 0
+
+
+memo = SingleFlight()
+# Series built from the files in memo, one per url and run
+series_memo = SingleFlight()
+
+
+# month-indexed numpy series of a {"YYYY-MM": value} file, or None if it could not be loaded;
+# numpy is only imported when a full history is displayed
+def get_series(url):
+    from .series import Series
+
+    def build(url):
+        json_data = get_url_json(url)
+        if not isinstance(json_data, dict):
+            return None
+        with span("parse", url, kind="series"):
+            return Series.from_json(json_data)
+
+    return series_memo.get(url, build)
+
+
+# fresh cache entries are read on demand, only what needs the network is prefetched
+def prefetch(urls, workers=default_workers):
+    claimed = {}
+    for url in dict.fromkeys(urls):
+        if url not in memo and fresh_meta(url) is None:
+            future, owner = memo.claim(url, warm=True)
+            if owner:
+                claimed[url] = future
+    try:
+        for result in fetch_engine.fetch_all(list(claimed), workers):
+            if not result.ok:
+                report_failure(result)
+            claimed.pop(result.url).set_result(result.data)
+    finally:
+        for future in claimed.values():
+            future.set_result(None)
+
+
+# metadata of a cache entry that can be used without asking the server, or None
+def fresh_meta(url):
+    if response_cache is None or refresh_cache:
+        return None
+    meta = response_cache.read_meta(url)
+    return meta if meta is not None and response_cache.is_fresh(meta) else None
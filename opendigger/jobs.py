@@ -0,0 +1,153 @@
+import io
+import os
+import json
+import time
+import signal
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .batch import print_summary, repo_error
+
+
+# Append-only checkpoint of a report run, one json line per finished repository.
+# A run with the same journal and options skips the repositories already done, so
+# an interrupted run over thousands of repositories resumes where it stopped. Every
+# line is synced before the next repository is counted; a line cut by a crash is ignored.
+class Journal:
+    def __init__(self, path, options):
+        self.path = path
+        self.options = options
+        self.done = set()
+        complete = True
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    complete = line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("status") == "done" and entry.get("options") == options:
+                        self.done.add(entry["repo"])
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.file = open(path, "a")
+        if not complete:
+            self.file.write("\n")
+
+    def record(self, repo_name, error, seconds):
+        entry = {"repo": repo_name, "status": "done" if error is None else "failed", "options": self.options,
+                 "seconds": round(seconds, 3), "time": time.time()}
+        if error is not None:
+            entry["error"] = error
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+# what a report depends on: a journal entry only counts for a run with the same options
+def job_options(args):
+    return {"index": args.index, "metric": args.metric, "month": args.month, "from": args.start, "to": args.end,
+            "last": args.last, "format": args.d, "output_dir": args.output_dir}
+
+
+# settings of the worker processes: charts are rendered inline (the workers already run
+# in parallel) and the request rate is shared between them
+def worker_args(args, processes):
+    return argparse.Namespace(**{**vars(args), "render_workers": 1, "rate": args.rate / processes if args.rate else 0,
+                                 "profile": False, "trace": None, "cprofile": None})
+
+
+# OpenDigger and options of this worker process, set by init_worker. The download,
+# cache and rendering settings (fetch, render and timing module state) and the data
+# prefix are module globals, so one process runs one configuration at a time: the
+# workers are separate processes, and two OpenDigger instances in one process share
+# whatever configure() set last.
+worker = None
+
+
+def init_worker(args, prefix):
+    global worker
+    from . import opendigger
+    # Ctrl-C is handled by the parent, which lets the running reports finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    opendigger.prefix = prefix
+    open_digger = opendigger.OpenDigger(args.output_dir)
+    open_digger.configure(args)
+    worker = (open_digger, args)
+
+
+# generates the report of one repository in a worker: (repo, error or None, seconds);
+# the terminal output of the report is dropped, the journal records the outcome. A
+# report missing data (see repo_error) is failed, so a resumed run generates it again.
+def run_job(repo_name):
+    open_digger, args = worker
+    start = time.time()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            open_digger.run_repo(repo_name, args.index, args.metric, args.month or None, args.d, args.workers)
+        error = repo_error(open_digger, repo_name, args.index, args.metric, args.month or None)
+        if error is not None:
+            return repo_name, error, time.time() - start
+        if not os.path.exists(open_digger.report_path(repo_name, args.d)):
+            return repo_name, "the report was not written", time.time() - start
+    except Exception as e:
+        return repo_name, f"{type(e).__name__}: {e}", time.time() - start
+    return repo_name, None, time.time() - start
+
+
+# Generates the -d report of every repository in `processes` worker processes. Each
+# worker has its own connections, cache handle and chart renderer, and each report its
+# own writer and folder, so nothing is shared but the files on disk. Finished
+# repositories are appended to the journal by this process only.
+def run_jobs(repos, args, prefix, journal_path):
+    start = time.time()
+    processes = max(args.processes, 1)
+    journal = Journal(journal_path, job_options(args))
+    todo = [repo_name for repo_name in dict.fromkeys(repos) if repo_name not in journal.done]
+    print(f"Generating {len(todo)} reports in {processes} processes, "
+          f"{len(repos) - len(todo)} already done in {journal_path}")
+    succeeded = []
+    failed = {}
+    # spawn: workers start from a clean interpreter instead of a copy of this one
+    pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn"), initializer=init_worker,
+                               initargs=(worker_args(args, processes), prefix))
+    futures = {pool.submit(run_job, repo_name): repo_name for repo_name in todo}
+
+    def record(future):
+        try:
+            repo_name, error, seconds = future.result()
+        except Exception as e:
+            # the worker process died
+            repo_name, error, seconds = futures[future], f"{type(e).__name__}: {e}", 0.0
+        journal.record(repo_name, error, seconds)
+        if error is None:
+            succeeded.append(repo_name)
+        else:
+            failed[repo_name] = error
+        print(f"[{len(succeeded) + len(failed)}/{len(todo)}] {repo_name} "
+              f"{'done' if error is None else 'failed: ' + error} in {seconds:.1f}s")
+
+    recorded = set()
+    try:
+        for future in as_completed(futures):
+            record(future)
+            recorded.add(future)
+    except KeyboardInterrupt:
+        print("Interrupted: finishing the running reports, run the same command again to resume")
+        for future in futures:
+            future.cancel()
+        for future in futures:
+            if future not in recorded and not future.cancelled():
+                record(future)
+    finally:
+        pool.shutdown(cancel_futures=True)
+        journal.close()
+    print_summary(succeeded, failed, time.time() - start)
+    return succeeded, failed
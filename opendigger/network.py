@@ -0,0 +1,119 @@
+import numpy as np
+
+default_top = 10
+default_damping = 0.85
+default_tolerance = 1e-8
+default_iterations = 100
+
+
+# Undirected weighted graph of an OpenDigger network file ({"nodes": [[name, weight], ...],
+# "edges": [[name, name, weight], ...]}) in compressed sparse row form: node names are
+# mapped to int32 ids once, the neighbours of node i are indices[indptr[i]:indptr[i + 1]]
+# with the matching edge weights, so even the largest networks are a handful of arrays.
+class Graph:
+    def __init__(self, names, node_weights, indptr, indices, weights):
+        self.names = names
+        self.node_weights = node_weights
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+
+    @classmethod
+    def from_json(cls, data):
+        nodes = data.get("nodes") or []
+        edges = data.get("edges") or []
+        node_weights = np.asarray([node[1] for node in nodes], dtype=np.float32)
+        weights = np.asarray([edge[2] for edge in edges], dtype=np.float32)
+        # node names, then the endpoints a0, b0, a1, b1, ... in the order they appear
+        all_names = [node[0] for node in nodes] + [name for edge in edges for name in edge[:2]]
+        # names are told apart by their int64 hash, which np.unique sorts several times
+        # faster than the strings; if two names share a hash the strings are used
+        keys = np.fromiter(map(hash, all_names), dtype=np.int64, count=len(all_names))
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        if len(first) != len(set(all_names)):
+            _, first, inverse = np.unique(np.asarray(all_names, dtype=str), return_index=True, return_inverse=True)
+        # ids in order of first appearance: the node list first, then nodes only
+        # named by an edge; a node listed twice keeps its first weight
+        appearance = np.argsort(first, kind="stable")
+        ids = np.empty(len(first), dtype=np.int32)
+        ids[appearance] = np.arange(len(first), dtype=np.int32)
+        first = first[appearance]
+        names = [all_names[i] for i in first.tolist()]
+        listed = first < len(nodes)
+        weights_of_nodes = np.zeros(len(names), dtype=np.float32)
+        weights_of_nodes[listed] = node_weights[first[listed]]
+        endpoint_ids = ids[inverse.reshape(-1)[len(nodes):]]
+        source = endpoint_ids[0::2]
+        target = endpoint_ids[1::2]
+        # every undirected edge is stored once in each direction, self loops once
+        loop = source == target
+        source, target = np.concatenate([source, target[~loop]]), np.concatenate([target, source[~loop]])
+        weights = np.concatenate([weights, weights[~loop]])
+        order = np.argsort(source, kind="stable")
+        indptr = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source, minlength=len(names)), out=indptr[1:])
+        return cls(names, weights_of_nodes, indptr, target[order], weights[order])
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def edge_count(self):
+        return (len(self.indices) + self.self_loops()) // 2
+
+    def self_loops(self):
+        rows = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.indptr))
+        return int(np.count_nonzero(rows == self.indices))
+
+    def degree(self):
+        return np.diff(self.indptr)
+
+    # sum of the edge weights of every node
+    def strength(self):
+        rows = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        return np.bincount(rows, weights=self.weights, minlength=len(self))
+
+    # the k neighbours of a node with the heaviest edges, as (id, weight) pairs
+    def top_neighbours(self, node, k=default_top):
+        start, end = self.indptr[node], self.indptr[node + 1]
+        weights = self.weights[start:end]
+        order = np.argsort(-weights, kind="stable")[:k]
+        return list(zip(self.indices[start:end][order].tolist(), weights[order].tolist()))
+
+    # weighted PageRank by power iteration, nodes without edges spread their rank evenly
+    def pagerank(self, damping=default_damping, tolerance=default_tolerance, iterations=default_iterations):
+        n = len(self)
+        if n == 0:
+            return np.zeros(0)
+        rows = np.repeat(np.arange(n), np.diff(self.indptr))
+        strength = np.bincount(rows, weights=self.weights, minlength=n)
+        dangling = strength == 0
+        share = self.weights / np.where(dangling, 1, strength)[rows]
+        rank = np.full(n, 1 / n)
+        for _ in range(iterations):
+            spread = np.bincount(self.indices, weights=rank[rows] * share, minlength=n)
+            updated = (1 - damping + damping * rank[dangling].sum()) / n + damping * spread
+            converged = np.abs(updated - rank).sum() < tolerance
+            rank = updated
+            if converged:
+                break
+        return rank
+
+    # nodes with the highest scores, best first
+    def top_nodes(self, scores, k=default_top):
+        k = min(k, len(self))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        return best[np.argsort(-scores[best], kind="stable")].tolist()
+
+    # edges among the given nodes as (position, position, weight), for drawing a sub graph
+    def sub_edges(self, nodes):
+        position = {node: i for i, node in enumerate(nodes)}
+        edges = []
+        for node in nodes:
+            start, end = self.indptr[node], self.indptr[node + 1]
+            for other, weight in zip(self.indices[start:end].tolist(), self.weights[start:end].tolist()):
+                if other in position and position[other] > position[node]:
+                    edges.append((position[node], position[other], weight))
+        return edges
@@ -1,78 +1,100 @@
 import os
-import json
+import re
 import argparse
 
-import numpy as np
-import plotext as plt
-import matplotlib.pyplot as matplot
 from datetime import datetime
 
-import urllib.request
-
-prefix = "https://oss.x-lab.info/open_digger/github/"
-pwd = "./"
+from . import fetch
+from . import render
+from . import timing
+from .cache import ResponseCache, cache_dir, default_ttl, default_max_size
+from .client import HTTPClient, default_pool_size, default_timeout
+from .report import ReportWriter, report_formats, print_table
+from .batch import run_batch, read_repo_list, default_concurrency
+from .render import ChartRenderer, render_line_chart, render_issues_chart, render_network_chart, \
+    set_chart_renderer, default_render_workers
+from .engine import FetchEngine, default_rate, default_retries, default_backoff
+from .fetch import get_url_json, get_json_data, get_series, load_json, set_response_cache, set_http_client, set_fetch_engine, \
+    set_snapshot, prefetch, default_workers
+
+prefix = os.environ.get("OPENDIGGER_PREFIX", "https://oss.x-lab.info/open_digger/github/")
+default_output_dir = "./"
 suffix_assets_folder = ".assets"
 suffix_png = ".png"
 delim_folder = "/"
 
-
-def get_url_json(url):
-    try:
-        response = urllib.request.urlopen(url)
-        data = response.read()
-        json_data = json.loads(data)
-        return json_data
-    except urllib.error.HTTPError as e:
-        print(f"HTTPError: {e.code} - {url} {e.reason}")
-    except urllib.error.URLError as e:
-        print(f"URLError: {e.reason}")
-    except json.JSONDecodeError as e:
-        print(f"JSONDecodeError: {e.msg}")
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-    return None
-
-
-def get_json_data(url, month):
-    json_data = get_url_json(url)
-    return json_data if month is None else json_data.get(month)
-
-
-def format_date_data(data):
-    return {datetime.strptime(d, '%Y-%m').strftime('%m/%Y'): v for d, v in data.items()}
-
-
+# json files each handler reads, used to download everything a command needs up front
+index_files = {
+    "openrank": ["openrank"],
+    "activity": ["activity"],
+    "attention": ["attention"],
+}
+metric_files = {
+    "active-dates-times": ["active_dates_times"],
+    "stars": ["stars"],
+    "technical_fork": ["technical_fork"],
+    "participants": ["participants"],
+    "contributors": ["new_contributors", "new_contributors_detail", "inactive_contributors"],
+    "bus_factor": ["bus_factor", "bus_factor_detail"],
+    "issues": ["issues_new", "issues_closed", "issue_comments", "issue_response_time",
+               "issue_resolution_duration", "issue_age"],
+    "code_change_line": ["code_change_lines_add", "code_change_lines_remove", "code_change_lines_sum"],
+    "pr": ["change_requests", "change_requests_accepted", "change_requests_reviews",
+           "change_request_response_time", "change_request_resolution_duration"],
+    "network": ["developer_network", "repo_network"],
+}
+# network files are much larger than the other metrics, -metric all leaves them out
+network_metrics = {"network"}
+# metrics that are only shown for a single month
+month_only_metrics = {"active-dates-times", "technical_fork", "participants", "contributors", "bus_factor"}
+# files with a large value per month: a single month is parsed while the file downloads
+# and the download stops once it is found, so they are not prefetched whole
+streamed_files = {"active_dates_times", "new_contributors_detail", "bus_factor_detail"}
+
+# rank command: scores repositories can be ranked by and their defaults
+rank_scores = ["growth", "growth-rate", "mean", "latest", "moving-average"]
+default_months = 12
+default_top = 50
+default_window = 3
+
+# serve command defaults
+default_host = "127.0.0.1"
+default_port = 8080
+default_memory = 256 * 1024 * 1024
+default_max_age = 60 * 60
+
+# checkpoint journal of --processes report runs, in -output-dir
+default_journal = "opendigger-journal.jsonl"
+
+# plotext is imported on first use so that text only queries start fast,
+# report charts are rendered by render.chart_renderer
 def plotext_plot(dates, metrics, repo_name: str, metrics_name: str, f=None, download=False, color='red', style="line"):
-    plt.clear_figure()
-    plt.date_form('m/Y')
-    plt.plotsize(50, 15)
-    if style == "line":
-        plt.plot(dates, metrics, color=color)
-    elif style == "bar":
-        plt.bar(dates, metrics, color=color)
-    plt.xlabel("Date")
-    plt.ylabel(metrics_name)
-    print(f"{repo_name} {metrics_name} figure:")
-    plt.show()
-    if download and f is not None:
-        file_path = pwd + repo_name + delim_folder + metrics_name + suffix_png
-        x = np.linspace(0, len(dates) - 1, 5, dtype=int)
-        x_labels = [dates[i] for i in x]
-        matplot.clf()
-        matplot.xticks(x, x_labels)
-        matplot.title(f"{metrics_name} and dates line plot")
-        matplot.xlabel('Dates')
-        matplot.ylabel(f'{metrics_name}')
-        matplot.plot(dates, metrics, color=color, label=metrics_name)
-        matplot.legend()
-        matplot.savefig(file_path)
+    with timing.span("plot", metrics_name, repo=repo_name):
+        import plotext as plt
+        plt.clear_figure()
+        plt.date_form('m/Y')
+        plt.plotsize(50, 15)
+        if style == "line":
+            plt.plot(dates, metrics, color=color)
+        elif style == "bar":
+            plt.bar(dates, metrics, color=color)
+        plt.xlabel("Date")
+        plt.ylabel(metrics_name)
+        print(f"{repo_name} {metrics_name} figure:")
+        plt.show()
+    if download and f is not None and f.figures:
+        file_path = f.chart_dir + delim_folder + metrics_name + suffix_png
+        render.chart_renderer.submit(render_line_chart, file_path, list(dates), list(metrics), metrics_name, color)
         f.write(f"#### {metrics_name} trend fig\n")
         f.write(f"> {repo_name} **{metrics_name}** trend is as follow:\n\n")
-        f.write(f"![image-{str(datetime.now().time())}](./{metrics_name + suffix_png})\n")
+        f.write(f"![image-{str(datetime.now().time())}]({f.link(file_path)})\n")
 
 
+# Everything a run writes goes under output_dir and every report gets its own writer
+# and chart folder, so one OpenDigger per process can generate reports in parallel.
 class OpenDigger:
-    def __init__(self):
+    def __init__(self, output_dir=default_output_dir):
+        self.output_dir = output_dir
         self.indexes = {
             "openrank": self.display_openrank,
             "activity": self.display_activity,
@@ -89,165 +111,68 @@ class OpenDigger:
             "issues": self.display_issues,
             "code_change_line": self.display_code_change_line,
             "pr": self.display_pr,
+            "network": self.display_networks,
             "all": self.diaplay_metrics_all
         }
         self.network = {
             "develop-net": self.display_develop_networks,
             "repo-net": self.display_repo_networks,
         }
+        # (start, end, last) months of the full histories shown, from -from / -to / -last
+        self.period = (None, None, None)
+
+    # a full history cut to the selected months, by binary search on the sorted months
+    def in_period(self, series):
+        return series.select(*self.period)
+
+    def describe_period(self):
+        start, end, last = self.period
+        parts = []
+        if start or end:
+            parts.append(f"{start or 'first month'} to {end or 'latest month'}")
+        if last:
+            parts.append(f"last {last} months")
+        return ", ".join(parts)
 
     ##########################################
     #             Indexes                    #
     ##########################################
     # OpenRank data manipulation
     def display_openrank(self, repo_name: str, month=None, f=None, download=False):
-        suffix = "/openrank.json"
-        openrank_data = get_json_data(prefix + repo_name + suffix, month)
-        print("OpenRank: ")
-        if openrank_data is None:
-            print("\tOpen Rank data not found or not updated here, try other month or metrics")
-            return
-        if month is None:
-            openrank_data.popitem()
-            openrank_data_formatted = {datetime.strptime(d, '%Y-%m').strftime('%m/%Y'): v for d, v in
-                                       openrank_data.items()}
-            openrank = list(openrank_data_formatted.values())
-            dates = list(openrank_data_formatted.keys())
-            plotext_plot(dates, openrank, repo_name, "OpenRank", f, download)
-            print("\nSpecific OpenRank data: ")
-            count = 0
-            if f is not None and download:
-                f.write(f"###  OpenRank data table\n")
-                f.write(f'|Dates and OpenRank||||\n')
-                f.write('| --- | --- | --- | --- |\n')
-                # Write the table rows
-                count = 0
-                for key, value in openrank_data.items():
-                    print(f"\t{key}:{value}\t", end="")
-                    # Check if four items have been written to the row
-                    if count % 4 == 0:
-                        print()
-                        f.write('|')  # Start a new row
-                    # Write the current item to the row
-                    f.write(f' {key}: {value} |')
-                    # Check if this is the last item in the row
-                    if count % 4 == 3:
-                        f.write('\n')  # End the row
-                    count += 1
-                # If the last row is not complete, add empty cells to fill it
-                if count % 4 != 0:
-                    empty_cells = 4 - (count % 4)
-                    f.write('|' + ' | '.join([''] * empty_cells) + '\n')
-                print()
-            else:
-                for key, value in openrank_data.items():
-                    print(f"\t{key}: {value}", end="\t")
-                    count += 1
-                    if count % 4 == 0:
-                        print()
-                print()
-        else:
-            print("\t" + month, end=" ")
-            print(openrank_data)
+        self.display_index(repo_name, "openrank", "OpenRank", "OpenRank", month, f, download)
 
     # activity data manipulation
     def display_activity(self, repo_name: str, month=None, f=None, download=False):
-        suffix = "/activity.json"
-        activity_data = get_json_data(prefix + repo_name + suffix, month)
-        if activity_data is None:
-            return
-        print("Activity: ")
-        if month is None:
-            activity_data.popitem()
-            meta_data_formatted = {datetime.strptime(d, '%Y-%m').strftime('%m/%Y'): v for d, v in activity_data.items()}
-            activities = list(meta_data_formatted.values())
-            dates = list(meta_data_formatted.keys())
-            plotext_plot(dates, activities, repo_name, "Activity", f, download)
-            print("\nSpecific activities data: ")
-            count = 0
-            if f is not None and download:
-                f.write(f"###  Activity data table\n")
-                f.write(f'|Dates and Activities||||\n')
-                f.write('| --- | --- | --- | --- |\n')
-                # Write the table rows
-                count = 0
-                for key, value in activity_data.items():
-                    print(f"\t{key}:{value}\t", end="")
-                    # Check if four items have been written to the row
-                    if count % 4 == 0:
-                        print()
-                        f.write('|')  # Start a new row
-                    # Write the current item to the row
-                    f.write(f' {key}: {value} |')
-                    # Check if this is the last item in the row
-                    if count % 4 == 3:
-                        f.write('\n')  # End the row
-                    count += 1
-                # If the last row is not complete, add empty cells to fill it
-                if count % 4 != 0:
-                    empty_cells = 4 - (count % 4)
-                    f.write('|' + ' | '.join([''] * empty_cells) + '\n')
-                print()
-            else:
-                for key, value in activity_data.items():
-                    print(f"\t{key}:{value}\t", end="")
-                    count += 1
-                    if count % 4 == 0:
-                        print()
-                print()
-        else:
-            print("\t" + month, end=" ")
-            print(activity_data)
+        self.display_index(repo_name, "activity", "Activity", "Activities", month, f, download)
 
     # attention data manipulation
     def display_attention(self, repo_name: str, month=None, f=None, download=False):
-        suffix = "/attention.json"
-        attention_data = get_json_data(prefix + repo_name + suffix, month)
-        if attention_data is None:
+        self.display_index(repo_name, "attention", "Attention", "Attention", month, f, download)
+
+    # one month, or the full history as a chart and a table of every month
+    def display_index(self, repo_name, index, title, column, month=None, f=None, download=False):
+        url = prefix + repo_name + delim_folder + index + ".json"
+        data = get_json_data(url, month) if month is not None else get_series(url)
+        print(f"{title}: ")
+        if data is None:
+            print(f"\t{title} data not found or not updated here, try other month or metrics")
             return
-        print("Attention: ")
         if month is None:
-            attention_data.popitem()
-            attention_data_formatted = {datetime.strptime(d, '%Y-%m').strftime('%m/%Y'): v for d, v in
-                                        attention_data.items()}
-            attention = list(attention_data_formatted.values())
-            dates = list(attention_data_formatted.keys())
-            plotext_plot(dates, attention, repo_name, "Attention", f, download)
-            print("\nSpecific attention data: ")
-            count = 0
+            data = self.in_period(data)
+            if len(data) == 0:
+                print(f"\tNo {title} data in {self.describe_period()}")
+                return
+            plotext_plot(data.labels(), data.value_list(), repo_name, title, f, download)
+            print(f"\nSpecific {title} data: ")
+            print_table(data)
             if f is not None and download:
-                f.write(f"###  Attention data table\n")
-                f.write(f'|Dates and Attention||||\n')
-                f.write('| --- | --- | --- | --- |\n')
-                # Write the table rows
-                count = 0
-                for key, value in attention_data.items():
-                    print(f"\t{key}: {value}", end="\t")
-                    # Check if four items have been written to the row
-                    if count % 4 == 0:
-                        print()
-                        f.write('|')  # Start a new row
-                    # Write the current item to the row
-                    f.write(f' {key}: {value} |')
-                    # Check if this is the last item in the row
-                    if count % 4 == 3:
-                        f.write('\n')  # End the row
-                    count += 1
-                # If the last row is not complete, add empty cells to fill it
-                if count % 4 != 0:
-                    empty_cells = 4 - (count % 4)
-                    f.write('|' + ' | '.join([''] * empty_cells) + '\n')
-                print()
-            else:
-                for key, value in attention_data.items():
-                    print(f"\t{key}: {value}", end="\t")
-                    count += 1
-                    if count % 4 == 0:
-                        print()
-                print()
+                f.table(repo_name, index, title, column, data)
         else:
             print("\t" + month, end=" ")
-            print(attention_data)
+            print(data)
+            if f is not None and download:
+                from .series import Series
+                f.table(repo_name, index, title, column, Series.from_json({month: data}))
 
     # all metrics data manipulation
     def display_all(self, repo_name: str, month=None, f=None, download=False):
@@ -262,7 +187,7 @@ class OpenDigger:
         if month is None:
             print("The metric corresponds to too much data, please specify the month in active_dates_times")
             return
-        data = get_json_data(prefix + repo_name + "/active_dates_times.json", month)
+        data = get_json_data(prefix + repo_name + "/active_dates_times.json", month, stream=True)
         if f is not None and download:
             f.write(f"#### Active dates and times for {repo_name}:\n")
             f.write(f"{data}\n")
@@ -272,20 +197,23 @@ class OpenDigger:
 
     def display_stars(self, repo_name: str, month, f=None, download=False):
         data = get_json_data(prefix + repo_name + "/stars.json", month)
+        if data is None:
+            print("\tStars data not found or not updated here, try other month or metrics")
+            return
         if f is not None and download:
             if month is None:
                 f.write(f"#### Stars⭐️per month for {repo_name}:\n")
                 f.write(f"{data} ⭐️\n")
-                data.popitem()
-                data_formateted = {datetime.strptime(d, '%Y-%m').strftime('%m/%Y'): v for d, v in data.items()}
-                data_values = list(data.values())
-                dates = list(data_formateted.keys())
-                plotext_plot(dates, data_values, repo_name, "Stars", f, download)
+                stars = get_series(prefix + repo_name + "/stars.json")
+                plotext_plot(stars.labels(), stars.value_list(), repo_name, "Stars", f, download)
             else:
                 f.write(f"- Stars⭐ in {month} for {repo_name}:\n")
                 f.write(f"{data} \n")
         else:
             print(f"Stars⭐per month for {repo_name}:\n", end="")
+            if month is not None:
+                print(f"\t{month}: {data}")
+                return
             count = 0
             for k, v in data.items():
                 count += 1
@@ -321,20 +249,20 @@ class OpenDigger:
         if month is None:
             return
         new_contributors = get_json_data(prefix + repo_name + "/new_contributors.json", month)  # int
-        contributors_detail = get_json_data(prefix + repo_name + "/new_contributors_detail.json", month)  # list
+        contributors_detail = get_json_data(prefix + repo_name + "/new_contributors_detail.json", month, stream=True)  # list
         inactive_contributors = get_json_data(prefix + repo_name + "/inactive_contributors.json", month)  # int
         if f is not None and download:
             f.write(f"#### Contributors info for {repo_name} in {month}:\n")
             f.write(f"1. new contributors: {new_contributors}\n")
             f.write(f"2. contributors names:\n")
-            for name in contributors_detail:
+            for name in contributors_detail or []:
                 f.write(f"- {name}\n")
             f.write(f"3. inactive contributors: {inactive_contributors}\n")
         else:
             print(f"Contributors for {repo_name} in {month}:\n")
             print(f"1. new contributors: {new_contributors}\n")
             print(f"2. contributors names:\n")
-            for name in contributors_detail:
+            for name in contributors_detail or []:
                 print(f"- {name}\n")
             print(f"3. inactive contributors: {inactive_contributors}\n")
 
@@ -343,12 +271,12 @@ class OpenDigger:
             print("The metric corresponds to too much data, please specify the month and retry for this metric")
             return
         data = get_json_data(prefix + repo_name + "/bus_factor.json", month)  # TODO: change .json file name
-        detail_data = get_json_data(prefix + repo_name + "/bus_factor_detail.json", month)
+        detail_data = get_json_data(prefix + repo_name + "/bus_factor_detail.json", month, stream=True)
         if f is not None and download:
             f.write(f"#### Bus factor for {repo_name}:\n")
             f.write(f"bus factor: {month}: {data}\n")
             count = 0
-            for _ in detail_data:
+            for _ in detail_data or []:
                 f.write(f"{_} ")
                 count += 1
                 if count % 4 == 0:
@@ -357,47 +285,20 @@ class OpenDigger:
             print(f"Bus factor for {repo_name}:\n", end="")
             print(f"{month}: {data}\t\n", end="")
             count = 0
-            for _ in detail_data:
+            for _ in detail_data or []:
                 print(f"{_} ", end="")
                 count += 1
                 if count % 4 == 0:
                     print()
 
-    def draw_issues_response(self, data, repo_name, month, f, download):
-        avg_data = data['avg']
-        levels_data = data['levels']
-        fig, (ax1, ax2) = matplot.subplots(2, 1, figsize=(10, 10))
-        x_avg = list(avg_data.keys())
-        y_avg = list(avg_data.values())
-
-        ax1.plot(x_avg, y_avg)
-        ax1.set_xlabel('Date')
-        ax1.set_ylabel('Average')
-        ax1.set_title('Average Values')
-        ax1.tick_params(axis='x', rotation=45)
-        x_levels = list(levels_data.keys())
-        y_levels = list(levels_data.values())
-
-        y1 = [level[0] for level in y_levels]
-        y2 = [level[1] for level in y_levels]
-        y3 = [level[2] for level in y_levels]
-        y4 = [level[3] for level in y_levels]
-
-        ax2.bar(x_levels, y1, label='Level 1')
-        ax2.bar(x_levels, y2, bottom=y1, label='Level 2')
-        ax2.bar(x_levels, y3, bottom=[sum(x) for x in zip(y1, y2)], label='Level 3')
-        ax2.bar(x_levels, y4, bottom=[sum(x) for x in zip(y1, y2, y3)], label='Level 4')
-
-        ax2.set_xlabel('Date')
-        ax2.set_ylabel('Levels')
-        ax2.set_title('Levels Stacked Bar Plot')
-        ax2.tick_params(axis='x', rotation=45)
-        ax2.legend()
-        matplot.tight_layout()
-        file_path = pwd + repo_name + delim_folder + "issues" + suffix_png
-        matplot.savefig(file_path)
-        f.write(f"> {repo_name} **issues** info is as follow:\n\n")
-        f.write(f"![image-{str(datetime.now().time())}](./issues{suffix_png})\n")
+    # one chart file per distribution, so the chart manifest can tell each of them is unchanged
+    def draw_issues_response(self, data, repo_name, file_name, title, month, f, download):
+        if data is None or not f.figures:
+            return
+        file_path = f.chart_dir + delim_folder + file_name + suffix_png
+        render.chart_renderer.submit(render_issues_chart, file_path, data)
+        f.write(f"> {repo_name} **{title}** info is as follow:\n\n")
+        f.write(f"![image-{str(datetime.now().time())}]({f.link(file_path)})\n")
 
     def display_issues(self, repo_name: str, month=None, f=None, download=False):
         issue_new = get_json_data(prefix + repo_name + "/issues_new.json", month)  # TODO: change .json file name, 3 types
@@ -413,9 +314,11 @@ class OpenDigger:
                 f.write(f"  - issue closed: {issue_closed}\n")
                 f.write(f"  - issue comments: {issue_comments}\n")
                 f.write(f"  - issue response time fig:\n")
-                self.draw_issues_response(issue_response_time, repo_name, month, f, download)
-                self.draw_issues_response(issue_resolution_duration, repo_name, month, f, download)
-                self.draw_issues_response(issue_age, repo_name, month, f, download)
+                self.draw_issues_response(issue_response_time, repo_name, "issue_response_time", "issue response time",
+                                          month, f, download)
+                self.draw_issues_response(issue_resolution_duration, repo_name, "issue_resolution_duration",
+                                          "issue resolution duration", month, f, download)
+                self.draw_issues_response(issue_age, repo_name, "issue_age", "issue age", month, f, download)
             else:
                 f.write(f"  - issue new: {issue_new}\n")
                 f.write(f"  - issue closed: {issue_closed}\n")
@@ -425,45 +328,91 @@ class OpenDigger:
             print(f"\tissue new: {issue_new}\n")
             print(f"\tissue closed: {issue_closed}\n")
             print(f"\tissue comments: {issue_comments}\n")
+        self.display_derived(repo_name, "Issues", "issues_new", "issues_closed", issue_response_time,
+                             issue_resolution_duration, month, f, download)
 
     def display_code_change_line(self, repo_name: str, month=None, f=None, download=False):
-        code_add = format_date_data(get_json_data(prefix + repo_name + "/code_change_lines_add.json", month))
-        code_remove = format_date_data(get_json_data(prefix + repo_name + "/code_change_lines_remove.json", month))
-        code_sum = format_date_data(get_json_data(prefix + repo_name + "/code_change_lines_sum.json", month))
+        code_add = get_json_data(prefix + repo_name + "/code_change_lines_add.json", month)
+        code_remove = get_json_data(prefix + repo_name + "/code_change_lines_remove.json", month)
+        code_sum = get_json_data(prefix + repo_name + "/code_change_lines_sum.json", month)
         if f is not None:
             f.write(f"#### Code change line info for {repo_name}:\n")
         print(f"Code change line for {repo_name}:\n")
-        plotext_plot(list(code_add.keys()), list(code_add.values()), repo_name, "code_chang_lines_add", f, download, color="green")
-        plotext_plot(list(code_remove.keys()), list(code_remove.values()), repo_name, "code_chang_lines_remove", f, download, color="green")
-        plotext_plot(list(code_sum.keys()), list(code_sum.values()), repo_name, "code_chang_lines_sum", f, download, color="green")
+        if code_add is None or code_remove is None or code_sum is None:
+            print("\tCode change line data not found or not updated here, try other month or metrics")
+            return
+        if month is not None:
+            print(f"\tcode lines add: {code_add}\n")
+            print(f"\tcode lines remove: {code_remove}\n")
+            print(f"\tcode lines sum: {code_sum}\n")
+            if f is not None and download:
+                f.write(f"- code lines add: {code_add}\n")
+                f.write(f"- code lines remove: {code_remove}\n")
+                f.write(f"- code lines sum: {code_sum}\n")
+            return
+        code_add = self.in_period(get_series(prefix + repo_name + "/code_change_lines_add.json"))
+        code_remove = self.in_period(get_series(prefix + repo_name + "/code_change_lines_remove.json"))
+        code_sum = self.in_period(get_series(prefix + repo_name + "/code_change_lines_sum.json"))
+        if len(code_add) == 0 or len(code_remove) == 0 or len(code_sum) == 0:
+            print(f"\tNo code change line data in {self.describe_period()}")
+            return
+        plotext_plot(code_add.labels(), code_add.value_list(), repo_name, "code_chang_lines_add", f, download, color="green")
+        plotext_plot(code_remove.labels(), code_remove.value_list(), repo_name, "code_chang_lines_remove", f, download, color="green")
+        plotext_plot(code_sum.labels(), code_sum.value_list(), repo_name, "code_chang_lines_sum", f, download, color="green")
 
 
     def display_pr(self, repo_name: str, month=None, f=None, download=False):
         open_pr = get_json_data(prefix + repo_name + "/change_requests.json", month)
         accepted_pr = get_json_data(prefix + repo_name + "/change_requests_accepted.json", month)
         review_pr = get_json_data(prefix + repo_name + "/change_requests_reviews.json", month)
-        pr_rr_time = get_json_data(prefix + repo_name + "/change_request_response_time.json", month)
-        pr_resol_duration = get_json_data(prefix + repo_name + "/change_request_resolution_duration.json", month)
+        pr_rr_time = get_url_json(prefix + repo_name + "/change_request_response_time.json")
+        pr_resol_duration = get_url_json(prefix + repo_name + "/change_request_resolution_duration.json")
         if f is not None and download:
             f.write(f"#### PR for {repo_name}:\n")
         print(f"PR for {repo_name}:\n")
+        if open_pr is None or accepted_pr is None or review_pr is None:
+            print("\tPR data not found or not updated here, try other month or metrics")
+            return
         if month is None:
-            open_pr.popitem()
-            open_pr = format_date_data(open_pr)
-            accepted_pr.popitem()
-            accepted_pr = format_date_data(accepted_pr)
-            review_pr.popitem()
-            review_pr = format_date_data(review_pr)
+            open_pr = self.in_period(get_series(prefix + repo_name + "/change_requests.json"))
+            accepted_pr = self.in_period(get_series(prefix + repo_name + "/change_requests_accepted.json"))
+            review_pr = self.in_period(get_series(prefix + repo_name + "/change_requests_reviews.json"))
             if len(open_pr) > 0:
-                plotext_plot(list(open_pr.keys()), list(open_pr.values()), repo_name, "open_pr", f, download, color="blue")
+                plotext_plot(open_pr.labels(), open_pr.value_list(), repo_name, "open_pr", f, download, color="blue")
             if len(accepted_pr) > 0:
-                plotext_plot(list(accepted_pr.keys()), list(accepted_pr.values()), repo_name, "accepted_pr", f, download, color="blue")
+                plotext_plot(accepted_pr.labels(), accepted_pr.value_list(), repo_name, "accepted_pr", f, download, color="blue")
             if len(review_pr) > 0:
-                plotext_plot(list(review_pr.keys()), list(review_pr.values()), repo_name, "review_pr", f, download, color="blue")
+                plotext_plot(review_pr.labels(), review_pr.value_list(), repo_name, "review_pr", f, download, color="blue")
         else:
             print(f"\topen pr: {open_pr}\n")
             print(f"\taccepted pr: {accepted_pr}\n")
             print(f"\treview pr: {review_pr}\n")
+        self.display_derived(repo_name, "PR", "change_requests", "change_requests_accepted", pr_rr_time,
+                             pr_resol_duration, month, f, download)
+
+    # Close/open ratios, monthly changes and median response / resolution times of issues
+    # or PRs, computed on numpy arrays of the full histories and shown for the month, the
+    # -from / -to / -last range or the last default_months months; written to the report
+    # when there is one, printed otherwise.
+    def display_derived(self, repo_name, title, opened_file, closed_file, response, resolution, month=None, f=None,
+                        download=False):
+        from .derived import Distribution, derive, print_derived, markdown_derived
+        opened = get_series(prefix + repo_name + delim_folder + opened_file + ".json")
+        closed = get_series(prefix + repo_name + delim_folder + closed_file + ".json")
+        if opened is None or closed is None:
+            return
+        columns = derive(opened, closed, Distribution.from_json(response), Distribution.from_json(resolution))
+        if month is not None:
+            columns = {name: series.between(month, month) for name, series in columns.items()}
+        elif any(self.period):
+            columns = {name: self.in_period(series) for name, series in columns.items()}
+        else:
+            columns = {name: series.last(default_months) for name, series in columns.items()}
+        if f is not None and download:
+            f.write(markdown_derived(title, columns))
+        else:
+            print_derived(title, columns)
+
     def diaplay_metrics_all(self, repo_name: str, month=None, f=None, download=False):
         self.display_stars(repo_name, month, f, download)
         self.display_active_dates_times(repo_name, month, f, download)
@@ -478,60 +427,327 @@ class OpenDigger:
     ##########################################
     #               NetWorks                 #
     ##########################################
+    def display_networks(self, repo_name: str, month=None, f=None, download=False):
+        for display in self.network.values():
+            display(repo_name, month, f, download)
+
     def display_develop_networks(self, repo_name: str, month=None, f=None, download=False):
-        pass
+        self.display_network(repo_name, "developer_network", "Developer network", "developer", f, download)
 
     def display_repo_networks(self, repo_name: str, month=None, f=None, download=False):
-        pass
+        self.display_network(repo_name, "repo_network", "Repo network", "repo", f, download)
+
+    # networks cover the recent activity of a repo and are not split by month
+    def display_network(self, repo_name, file_name, title, node_name, f=None, download=False):
+        from .network import Graph, default_top
+        data = get_url_json(prefix + repo_name + delim_folder + file_name + ".json")
+        print(f"{title} for {repo_name}:")
+        if not data:
+            print(f"\t{title} data not found or not updated here, try other metrics")
+            return
+        graph = Graph.from_json(data)
+        degree = graph.degree()
+        strength = graph.strength()
+        ranks = graph.pagerank()
+        top = graph.top_nodes(ranks, default_top)
+        print(f"\t{len(graph)} {node_name}s, {graph.edge_count} edges")
+        print(f"\t{'rank':<5} {node_name:<40} {'pagerank':>10} {'degree':>8} {'weight':>10}")
+        for i, node in enumerate(top, start=1):
+            print(f"\t{i:<5} {graph.names[node]:<40} {ranks[node]:>10.4f} {degree[node]:>8} {strength[node]:>10.2f}")
+        if top:
+            neighbours = graph.top_neighbours(top[0], default_top)
+            print(f"\tclosest to {graph.names[top[0]]}: "
+                  + ", ".join(f"{graph.names[node]} ({weight:.2f})" for node, weight in neighbours))
+        if f is not None and download:
+            f.write(f"#### {title} for {repo_name}:\n")
+            f.write(f"- {len(graph)} {node_name}s, {graph.edge_count} edges\n\n")
+            f.write(f"| rank | {node_name} | pagerank | degree | weight |\n")
+            f.write("| --- | --- | --- | --- | --- |\n")
+            for i, node in enumerate(top, start=1):
+                f.write(f"| {i} | {graph.names[node]} | {ranks[node]:.4f} | {degree[node]} | {strength[node]:.2f} |\n")
+            if top and f.figures:
+                file_path = f.chart_dir + delim_folder + file_name + suffix_png
+                render.chart_renderer.submit(render_network_chart, file_path, [graph.names[node] for node in top],
+                                             ranks[top].tolist(), graph.sub_edges(top), f"{title} of {repo_name}")
+                f.write(f"\n> {repo_name} **{title}** of the top {len(top)} {node_name}s is as follow:\n\n")
+                f.write(f"![image-{str(datetime.now().time())}]({f.link(file_path)})\n")
+
+    # index / metric handlers of an -index / -metric option, "all" expanded without the networks
+    def handler_names(self, index=None, metric=None):
+        names = []
+        if index is not None:
+            names += index_files.keys() if index == "all" else [index]
+        if metric is not None:
+            names += [name for name in metric_files if name not in network_metrics] if metric == "all" else [metric]
+        return names
+
+    # json files the handler of an index or metric reads
+    def handler_files(self, name):
+        return index_files.get(name) or metric_files.get(name, [])
+
+    # urls of every json file the given index / metric handlers will read
+    def plan_urls(self, repo_name: str, index=None, metric=None, month=None):
+        urls = []
+        for name in self.handler_names(index, metric):
+            if month is None and name in month_only_metrics:
+                continue
+            urls += [prefix + repo_name + delim_folder + file + ".json" for file in self.handler_files(name)
+                     if month is None or file not in streamed_files]
+        return urls
+
+    # every file a snapshot needs to answer any index and metric query of a repo offline
+    def plan_snapshot_urls(self, repo_name: str):
+        files = [file for files in list(index_files.values()) + list(metric_files.values()) for file in files]
+        return [prefix + repo_name + delim_folder + file + ".json" for file in files]
 
     # command line arguments parser
+    # --profile / --trace / --cprofile wrap the whole command
     def run(self, args):
-        repo_name = args.repo
+        tracer = timing.Tracer() if args.profile or args.trace else None
+        if tracer is not None:
+            timing.set_tracer(tracer)
+        profiler = None
+        if args.cprofile:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            self.run_command(args)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(args.cprofile)
+                print(f"cProfile stats written to {args.cprofile}, view them with: python -m pstats {args.cprofile}")
+            if tracer is not None:
+                timing.set_tracer(timing.NullTracer())
+                if args.profile:
+                    print(tracer.summary())
+                trace_file = args.trace or timing.default_trace_file
+                tracer.write(trace_file)
+                print(f"Trace written to {trace_file}, open it in chrome://tracing or https://ui.perfetto.dev")
+
+    def run_command(self, args):
+        if is_job_run(args):
+            # the reports are generated by worker processes, each configured like this one
+            from .jobs import run_jobs
+            journal = args.journal or os.path.join(args.output_dir, default_journal)
+            run_jobs(read_repo_list(args.repos_file), args, prefix, journal)
+            return
+        self.configure(args)
         month = args.month if args.month else None
-        index = args.index
-        metric = args.metric
-        download = True if args.d else False
-        download_type = args.d
-
+        if args.command == "snapshot":
+            from .snapshot import export_snapshot
+            export_snapshot(args.output, read_repo_list(args.repos_file), self.plan_snapshot_urls, fetch.fetch_engine,
+                            args.workers, prefix)
+        elif args.command == "serve":
+            from .server import Api, JsonStore, load_url, reload_url, serve
+            store = JsonStore(load_url, args.memory, args.max_age, reload_url)
+            serve(Api(self, store, prefix, args.workers), args.host, args.port)
+        elif args.command in ("rank", "aggregate"):
+            self.run_rank(read_repo_list(args.repos_file), args.index, args.by, args.months, args.top, args.window,
+                          args.workers)
+        else:
+            self.run_reports(args, month)
+        if fetch.response_cache is not None:
+            print(fetch.cache_stats.summary())
+        if fetch.snapshot is not None:
+            print(fetch.snapshot.summary())
+            set_snapshot(None)
+        print(fetch.memo.summary())
+        fetch.memo.clear()
+        fetch.series_memo.clear()
+        if render.chart_renderer.rendered or render.chart_renderer.unchanged:
+            print(render.chart_renderer.summary())
+        render.chart_renderer.shutdown()
+
+    # download, cache, rendering and output settings of a run; all but the output settings
+    # are module globals, shared by every OpenDigger of the process
+    def configure(self, args):
+        set_http_client(HTTPClient(args.pool_size, args.timeout))
+        set_fetch_engine(FetchEngine(load_json, args.rate, args.retries, args.backoff, args.workers))
+        set_chart_renderer(ChartRenderer(args.render_workers))
+        if args.snapshot:
+            from .snapshot import Snapshot
+            set_snapshot(Snapshot(args.snapshot, prefix))
+        if args.no_cache or args.snapshot:
+            set_response_cache(None)
+        else:
+            set_response_cache(ResponseCache(args.cache_dir, args.cache_ttl, args.cache_max_size), args.refresh)
+        self.output_dir = args.output_dir
+        self.period = (args.start, args.end, args.last)
+
+    def run_reports(self, args, month):
+        report = None
+        if args.report_file:
+            directory = os.path.dirname(args.report_file)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            report = ReportWriter(args.report_file, args.d or "md")
+        download_type = args.d or ("md" if report is not None else None)
+        try:
+            if args.repos_file:
+                run_batch(self, read_repo_list(args.repos_file), args.index, args.metric, month, download_type,
+                          args.concurrency, args.workers, report)
+            else:
+                self.run_repo(args.repo, args.index, args.metric, month, download_type, args.workers, report)
+        finally:
+            if report is not None:
+                report.close()
+                print(f"The reports were written to {args.report_file}.")
+
+    # rank repositories by an index and print percentiles across all of them
+    def run_rank(self, repos, index="openrank", by="growth", months=default_months, top=default_top,
+                 window=default_window, workers=default_workers):
+        from . import aggregate
+        urls = [prefix + repo_name + delim_folder + index + ".json" for repo_name in repos]
+        prefetch(urls, workers)
+        series_list = [get_series(url) for url in urls]
+        month_axis, matrix = aggregate.align(series_list)
+        stats = aggregate.summarize(matrix, months, window)
+        aggregate.print_ranking(repos, stats, by, top, index, months, window)
+        aggregate.print_portfolio(month_axis, matrix, index, months)
+
+    def run_repo(self, repo_name: str, index=None, metric=None, month=None, download_type=None, workers=default_workers,
+                 report=None):
+        download = True if download_type else False
+        if repo_name and (index in self.indexes or metric in self.metrics):
+            prefetch(self.plan_urls(repo_name, index, metric, month), workers)
+        try:
+            self.display_repo(repo_name, index, metric, month, download, download_type, report)
+        finally:
+            fetch.memo.forget_prefix(self.repo_prefix(repo_name))
+            fetch.series_memo.forget_prefix(self.repo_prefix(repo_name))
+
+    # start of the url of every file of a repository
+    def repo_prefix(self, repo_name):
+        return prefix + repo_name + delim_folder
+
+    # `report` is a shared ReportWriter (-report-file), otherwise every repo gets its own file
+    def display_repo(self, repo_name, index, metric, month, download, download_type, report=None):
         if repo_name and download and (index in self.indexes or metric in self.metrics):
             print("repo.name: " + repo_name)
             print("repo.url: " + "https://github.com/" + repo_name)
-            dir_path = pwd + repo_name + '/'
-            file_path = dir_path + "OpenDiggerInfo." + download_type
-            directory = os.path.dirname(dir_path)
-            if not os.path.exists(directory):
-                os.makedirs(directory)
-            with open(f"{file_path}", "w") as f:
-                f.write(f"# OpenDigger Data Analysis - {repo_name}\n\n")
-                f.write(f"### Repo\n")
-                f.write(f"- repo name: {repo_name}\n")
-                f.write(f"- repo url: https://github.com/{repo_name}\n")
-                if month:
-                    f.write(f"- month: {month}\n")
-                if index is not None:
-                    self.indexes[index](repo_name, month, f, download)
-                if metric is not None:
-                    f.write("### Repo Metrics\n")
-                    self.metrics[metric](repo_name, month, f, download)
-                if os.path.exists(file_path):
-                    print(f"The download file write successfully in {file_path}.")
-                else:
-                    print("The download file failed to write.")
-            f.close()
+            dir_path = self.repo_dir(repo_name)
+            if not os.path.exists(dir_path):
+                os.makedirs(dir_path)
+            if report is not None:
+                report.chart_dir = dir_path
+                self.write_report(report, repo_name, index, metric, month, download)
+                return
+            file_path = self.report_path(repo_name, download_type)
+            with ReportWriter(file_path, download_type) as f:
+                self.write_report(f, repo_name, index, metric, month, download)
+            if os.path.exists(file_path):
+                print(f"The download file write successfully in {file_path}.")
+            else:
+                print("The download file failed to write.")
         elif repo_name and (index in self.indexes or metric in self.metrics):
             print("repo.name: " + repo_name)
             print("repo.url: " + "https://github.com/" + repo_name)
             if index is not None:
                 print("repo indexes: ")
-                self.indexes[index](repo_name, month)
+                with timing.span("display", f"{repo_name} -index {index}"):
+                    self.indexes[index](repo_name, month)
             if metric is not None:
                 print("repo metrics: ")
-                self.metrics[metric](repo_name, month)
+                with timing.span("display", f"{repo_name} -metric {metric}"):
+                    self.metrics[metric](repo_name, month)
         else:
             print("Please provide a repository name and a valid metric.")
 
-
-def main():
+    # folder of the report and charts of a repository
+    def repo_dir(self, repo_name):
+        return os.path.join(self.output_dir, repo_name)
+
+    def report_path(self, repo_name, download_type):
+        return os.path.join(self.repo_dir(repo_name), "OpenDiggerInfo." + download_type)
+
+    def write_report(self, f, repo_name, index, metric, month, download):
+        f.write(f"# OpenDigger Data Analysis - {repo_name}\n\n")
+        f.write(f"### Repo\n")
+        f.write(f"- repo name: {repo_name}\n")
+        f.write(f"- repo url: https://github.com/{repo_name}\n")
+        if month:
+            f.write(f"- month: {month}\n")
+        elif any(self.period):
+            f.write(f"- months: {self.describe_period()}\n")
+        if index is not None:
+            with timing.span("display", f"{repo_name} -index {index}"):
+                self.indexes[index](repo_name, month, f, download)
+        if metric is not None:
+            f.write("### Repo Metrics\n")
+            with timing.span("display", f"{repo_name} -metric {metric}"):
+                self.metrics[metric](repo_name, month, f, download)
+        render.chart_renderer.wait()
+
+
+def month_argument(value):
+    if not re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", value):
+        raise argparse.ArgumentTypeError(f"invalid month {value!r}, expected YYYY-MM")
+    return value
+
+
+def positive_int(value):
+    if not value.isdigit() or int(value) == 0:
+        raise argparse.ArgumentTypeError(f"invalid count {value!r}, expected a positive number")
+    return int(value)
+
+
+# -repos-file reports generated by a pool of processes (--processes) or resumed from a --journal
+def is_job_run(args):
+    return args.command is None and bool(args.repos_file) and bool(args.d) and (args.processes > 1 or bool(args.journal))
+
+
+# download, cache and rendering options shared by every command; a subcommand parser
+# gets them without defaults, so options given before the command are kept
+def add_tuning_arguments(parser, subcommand=False):
+    def default(value):
+        return argparse.SUPPRESS if subcommand else value
+
+    parser.add_argument("--workers", type=int, default=default(default_workers),
+                        help=f"Number of files downloaded in parallel (default: {default_workers}).")
+    parser.add_argument("--concurrency", type=int, default=default(default_concurrency),
+                        help=f"Number of repositories downloaded at the same time in -repos-file mode "
+                             f"(default: {default_concurrency}).")
+    parser.add_argument("--rate", type=float, default=default(default_rate),
+                        help="Maximum requests per second sent to the OpenDigger server, 0 for no limit "
+                             f"(default: {default_rate}).")
+    parser.add_argument("--retries", type=int, default=default(default_retries),
+                        help=f"Retries for server errors and network failures (default: {default_retries}).")
+    parser.add_argument("--timeout", type=float, default=default(default_timeout),
+                        help=f"Seconds without an answer from the server before a request is abandoned "
+                             f"(default: {default_timeout}).")
+    parser.add_argument("--backoff", type=float, default=default(default_backoff),
+                        help=f"Delay in seconds before the first retry, doubled for each further retry "
+                             f"(default: {default_backoff}).")
+    parser.add_argument("--pool-size", type=int, default=default(default_pool_size),
+                        help=f"Number of keep-alive connections kept open to the OpenDigger server "
+                             f"(default: {default_pool_size}).")
+    parser.add_argument("--render-workers", type=int, default=default(default_render_workers),
+                        help=f"Number of processes rendering report charts, 1 renders in the main process "
+                             f"(default: {default_render_workers}).")
+    parser.add_argument("--no-cache", action="store_true", default=default(False),
+                        help="Always download data, bypassing the local cache.")
+    parser.add_argument("--refresh", action="store_true", default=default(False),
+                        help="Revalidate every cached response with the server, ignoring the cache ttl.")
+    parser.add_argument("--cache-dir", default=default(cache_dir), help=f"Local cache directory (default: {cache_dir}).")
+    parser.add_argument("--cache-ttl", type=int, default=default(default_ttl),
+                        help=f"Seconds a cached response stays fresh (default: {default_ttl}).")
+    parser.add_argument("--cache-max-size", type=int, default=default(default_max_size),
+                        help=f"Maximum cache size in bytes, least recently used entries are evicted first "
+                             f"(default: {default_max_size}).")
+    parser.add_argument("--profile", action="store_true", default=default(False),
+                        help="Print the time spent downloading, parsing, plotting, rendering and writing files, "
+                             f"and write a trace of every step (default file: {timing.default_trace_file}).")
+    parser.add_argument("--trace", default=default(None),
+                        help="File the Chrome trace-event json of the run is written to.")
+    parser.add_argument("--cprofile", default=default(None), help="Write cProfile statistics of the run to this file.")
+    parser.add_argument("--snapshot", default=default(None),
+                        help="Read all data from a snapshot file made by `opendigger snapshot export` "
+                             "instead of the OpenDigger server.")
+
+
+def make_parser():
     parser = argparse.ArgumentParser(description="Get OpenRank data for a GitHub repository.")
     parser.add_argument("-repo", help="GitHub repository name in the format <owner>/<repo>.")
     parser.add_argument("-index", choices=["openrank", "activity", "attention", "all"], help="Metric to retrieve."
@@ -539,9 +755,73 @@ def main():
     parser.add_argument("-metric", choices=["active-dates-times", "stars", "technical_fork", "participants",
                                             "contributors", "bus_factor", "issues", "code_change_line",
                                             "pr", "network", "all"])
+    parser.add_argument("-repos-file", help="File with one <owner>/<repo> per line to process in a single run, "
+                                            "use - to read the list from stdin.")
     parser.add_argument("-month", help="Month to retrieve OpenRank data for in the format YYYY-MM.")
-    parser.add_argument("-d", choices=["md"], help="Download OpenRank info in Markdown or text format.")
+    parser.add_argument("-from", dest="start", type=month_argument,
+                        help="First month (YYYY-MM) of the history shown by openrank, activity, attention, "
+                             "code_change_line and pr.")
+    parser.add_argument("-to", dest="end", type=month_argument, help="Last month (YYYY-MM) of the history shown.")
+    parser.add_argument("-last", type=positive_int, help="Only show the last N months of the history.")
+    parser.add_argument("-d", choices=report_formats, help="Download OpenRank info as a Markdown report, or the index "
+                                                          "tables as CSV or JSON lines.")
+    parser.add_argument("-report-file", help="Write the reports of every repository into this one file "
+                                             "(format from -d, Markdown by default).")
+    parser.add_argument("-output-dir", default=default_output_dir,
+                        help="Folder the <owner>/<repo> report folders are written to (default: current folder).")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Generate the -repos-file reports in this many processes, recording finished "
+                             "repositories in a journal so an interrupted run can be resumed.")
+    parser.add_argument("--journal", help=f"Journal of finished reports, repositories already done are skipped "
+                                          f"(default: {default_journal} in -output-dir when --processes is set).")
+    add_tuning_arguments(parser)
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    rank_parser = commands.add_parser("rank", aliases=["aggregate"],
+                                      help="Rank repositories by an index and show percentiles across them.")
+    rank_parser.add_argument("-repos-file", required=True,
+                             help="File with one <owner>/<repo> per line, use - to read the list from stdin.")
+    rank_parser.add_argument("-index", choices=["openrank", "activity", "attention"], default="openrank",
+                             help="Index to compare (default: openrank).")
+    rank_parser.add_argument("-by", choices=rank_scores, default="growth",
+                             help="Score repositories are ranked by (default: growth).")
+    rank_parser.add_argument("-months", type=int, default=default_months,
+                             help=f"Number of recent months the scores cover (default: {default_months}).")
+    rank_parser.add_argument("-top", type=int, default=default_top,
+                             help=f"Number of repositories listed (default: {default_top}).")
+    rank_parser.add_argument("-window", type=int, default=default_window,
+                             help=f"Months in the moving average (default: {default_window}).")
+    add_tuning_arguments(rank_parser, subcommand=True)
+    snapshot_parser = commands.add_parser("snapshot", help="Bundle the data of many repositories for offline runs.")
+    snapshot_parser.add_argument("action", choices=["export"], help="export: download every index and metric file "
+                                                                    "of the listed repositories into one file.")
+    snapshot_parser.add_argument("-repos-file", "--repos-file", required=True,
+                                 help="File with one <owner>/<repo> per line, use - to read the list from stdin.")
+    snapshot_parser.add_argument("-o", "--output", required=True, help="Snapshot file to write.")
+    add_tuning_arguments(snapshot_parser, subcommand=True)
+    serve_parser = commands.add_parser("serve", help="Answer index and metric queries over HTTP from an in-memory store.")
+    serve_parser.add_argument("--host", default=default_host, help=f"Address to listen on (default: {default_host}).")
+    serve_parser.add_argument("--port", type=int, default=default_port, help=f"Port to listen on (default: {default_port}).")
+    serve_parser.add_argument("--memory", type=int, default=default_memory,
+                              help=f"Bytes of parsed data kept in memory, least recently used files are dropped first "
+                                   f"(default: {default_memory}).")
+    serve_parser.add_argument("--max-age", type=int, default=default_max_age,
+                              help=f"Seconds after which a file is reloaded in the background (default: {default_max_age}).")
+    add_tuning_arguments(serve_parser, subcommand=True)
+    return parser
+
+
+def main():
+    parser = make_parser()
     args = parser.parse_args()
+    if args.month and (args.start or args.end or args.last):
+        parser.error("-month cannot be combined with -from, -to or -last")
+    if args.metric and args.d in ("csv", "jsonl"):
+        # the metric handlers write free text and figures, which only markdown reports hold
+        parser.error(f"-d {args.d} only holds the -index tables, use -d md for -metric reports")
+    if args.command is None and (args.processes > 1 or args.journal) and not (args.repos_file and args.d):
+        parser.error("--processes and --journal generate the -d reports of a -repos-file")
+    if (args.processes > 1 or args.journal) and args.report_file:
+        parser.error("--processes and --journal write one report per repository, they cannot be combined with -report-file")
 
     open_digger = OpenDigger()
     open_digger.run(args)
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from . import timing
+from .cache import write_atomic
+
+default_render_workers = os.cpu_count() or 1
+manifest_name = "charts.json"
+chart_version = 1
+
+
+# Charts for the markdown report are drawn on their own matplotlib Figure with
+# an Agg canvas, never through the pyplot state machine, so they can be rendered
+# in worker processes while the report text is being written.
+def render_line_chart(file_path, dates, metrics, metrics_name, color):
+    import numpy as np
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    x = np.linspace(0, len(dates) - 1, 5, dtype=int)
+    x_labels = [dates[i] for i in x]
+    ax.set_xticks(x)
+    ax.set_xticklabels(x_labels)
+    ax.set_title(f"{metrics_name} and dates line plot")
+    ax.set_xlabel('Dates')
+    ax.set_ylabel(f'{metrics_name}')
+    ax.plot(dates, metrics, color=color, label=metrics_name)
+    ax.legend()
+    fig.savefig(file_path)
+    return file_path
+
+
+def render_issues_chart(file_path, data):
+    import numpy as np
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from .derived import Distribution
+
+    distribution = Distribution.from_json(data)
+    fig = Figure(figsize=(10, 10))
+    FigureCanvasAgg(fig)
+    ax1, ax2 = fig.subplots(2, 1)
+    dates = distribution.keys()
+
+    ax1.plot(dates, distribution.avg)
+    ax1.set_xlabel('Date')
+    ax1.set_ylabel('Average')
+    ax1.set_title('Average Values')
+    ax1.tick_params(axis='x', rotation=45)
+
+    # the bottom of every level is the cumulative sum of the levels below it
+    heights = np.nan_to_num(distribution.levels)
+    bottoms = distribution.stacks()
+    for level in range(heights.shape[1]):
+        ax2.bar(dates, heights[:, level], bottom=bottoms[:, level], label=f'Level {level + 1}')
+
+    ax2.set_xlabel('Date')
+    ax2.set_ylabel('Levels')
+    ax2.set_title('Levels Stacked Bar Plot')
+    ax2.tick_params(axis='x', rotation=45)
+    ax2.legend()
+    fig.tight_layout()
+    fig.savefig(file_path)
+    return file_path
+
+
+# nodes on a circle, sized by rank, edges drawn with their weight as line width
+def render_network_chart(file_path, names, ranks, edges, title):
+    import numpy as np
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(10, 10))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    angles = np.linspace(0, 2 * np.pi, len(names), endpoint=False)
+    x, y = np.cos(angles), np.sin(angles)
+    heaviest = max((weight for _, _, weight in edges), default=1) or 1
+    for a, b, weight in edges:
+        ax.plot([x[a], x[b]], [y[a], y[b]], color="gray", alpha=0.5, linewidth=0.5 + 3 * weight / heaviest)
+    top_rank = max(ranks, default=1) or 1
+    ax.scatter(x, y, s=[100 + 900 * rank / top_rank for rank in ranks], color="tab:blue", zorder=2)
+    for name, xi, yi in zip(names, x, y):
+        ax.annotate(name, (xi * 1.12, yi * 1.12), ha="center", va="center", fontsize=8)
+    ax.set_title(title)
+    ax.set_xlim(-1.3, 1.3)
+    ax.set_ylim(-1.3, 1.3)
+    ax.set_aspect("equal")
+    ax.axis("off")
+    fig.savefig(file_path)
+    return file_path
+
+
+# runs in the worker: (start, seconds, pid) of the render for the --profile trace
+def timed_render(render, file_path, *args):
+    start = time.perf_counter()
+    render(file_path, *args)
+    return start, time.perf_counter() - start, os.getpid()
+
+
+# Process pool rendering the report charts. With a single worker charts are
+# rendered inline. Jobs writing the same file are kept in submission order.
+# A manifest in each report folder maps every chart to the hash of its inputs,
+# so charts whose data did not change since the last report are not redrawn.
+class ChartRenderer:
+    def __init__(self, workers=default_render_workers):
+        self.workers = workers
+        self.pool = None
+        self.pending = {}
+        self.manifests = {}
+        self.rendered = 0
+        self.unchanged = 0
+
+    def submit(self, render, file_path, *args):
+        if file_path in self.pending:
+            future, digest = self.pending.pop(file_path)
+            self.report(file_path, future.result, digest)
+        digest = chart_digest(render, args)
+        manifest = self.manifest(os.path.dirname(file_path))
+        name = os.path.basename(file_path)
+        if manifest.get(name) == digest and os.path.exists(file_path):
+            self.unchanged += 1
+            return
+        manifest.pop(name, None)
+        if self.workers <= 1:
+            self.report(file_path, lambda: timed_render(render, file_path, *args), digest)
+            return
+        if self.pool is None:
+            # spawn: the parent may have download threads running, forking them is unsafe
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self.pending[file_path] = (self.pool.submit(timed_render, render, file_path, *args), digest)
+
+    def wait(self):
+        pending, self.pending = self.pending, {}
+        for file_path, (future, digest) in pending.items():
+            self.report(file_path, future.result, digest)
+        for folder, manifest in self.manifests.items():
+            try:
+                with timing.span("write", os.path.join(folder, manifest_name)):
+                    write_atomic(os.path.join(folder, manifest_name), json.dumps(manifest, indent=2).encode("utf-8"))
+            except OSError as e:
+                print(f"Failed to write chart manifest in {folder}: {e}")
+        self.manifests = {}
+
+    def report(self, file_path, result, digest):
+        try:
+            start, duration, pid = result()
+        except Exception as e:
+            print(f"Failed to render {file_path}: {e}")
+            return
+        timing.tracer.add("render", file_path, start, duration, pid=pid if pid != os.getpid() else None)
+        self.rendered += 1
+        self.manifest(os.path.dirname(file_path))[os.path.basename(file_path)] = digest
+
+    def manifest(self, folder):
+        if folder not in self.manifests:
+            try:
+                with open(os.path.join(folder, manifest_name), "r") as f:
+                    self.manifests[folder] = json.load(f)
+            except (OSError, ValueError):
+                self.manifests[folder] = {}
+        return self.manifests[folder]
+
+    def summary(self):
+        return f"Charts: {self.rendered} rendered, {self.unchanged} unchanged"
+
+    def shutdown(self):
+        self.wait()
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+
+# hash of everything that ends up in a chart; bump chart_version when the drawing code changes
+def chart_digest(render, args):
+    content = json.dumps([chart_version, render.__name__, args], sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+# renderer used for report charts, configured by OpenDigger.run
+chart_renderer = ChartRenderer(1)
+
+
+def set_chart_renderer(renderer):
+    global chart_renderer
+    chart_renderer.shutdown()
+    chart_renderer = renderer
@@ -0,0 +1,97 @@
+import io
+import os
+import csv
+import json
+
+from .timing import span
+
+report_formats = ["md", "csv", "jsonl"]
+table_columns = 4
+# characters collected in memory before they are written to the file
+buffer_size = 64 * 1024
+
+
+# Report file for -d. Text is collected in memory and written in large blocks.
+# Markdown reports hold the headings, notes and figures the display handlers write
+# with write() and each table() as a 4 column table; CSV and JSON lines reports
+# only hold the table rows, one "repo, metric, month, value" record per month.
+# One writer can take the reports of many repositories (-report-file). Charts are
+# written to chart_dir, which a shared writer moves to the folder of each repository.
+class ReportWriter:
+    def __init__(self, path, fmt="md", chart_dir=None):
+        self.path = path
+        self.format = fmt
+        self.folder = os.path.dirname(path) or "."
+        self.chart_dir = chart_dir or self.folder
+        self.file = open(path, "w", newline="")
+        self.buffer = io.StringIO()
+        self.csv = csv.writer(self.buffer, lineterminator="\n")
+        if fmt == "csv":
+            self.csv.writerow(["repo", "metric", "month", "value"])
+
+    # figures and free text only exist in markdown reports
+    @property
+    def figures(self):
+        return self.format == "md"
+
+    def write(self, text):
+        if self.format == "md":
+            self.buffer.write(text)
+            self.flush_if_full()
+
+    def table(self, repo_name, metric, title, column, series):
+        if self.format == "md":
+            self.buffer.write(markdown_table(title, column, series))
+        elif self.format == "csv":
+            self.csv.writerows([repo_name, metric, key, number(value)] for key, value in series.items())
+        else:
+            self.buffer.writelines(json.dumps({"repo": repo_name, "metric": metric, "month": key,
+                                               "value": number(value)}) + "\n" for key, value in series.items())
+        self.flush_if_full()
+
+    # link to a file (a chart) relative to the report
+    def link(self, file_path):
+        link = os.path.relpath(file_path, self.folder).replace(os.sep, "/")
+        return link if link.startswith("../") else "./" + link
+
+    def flush_if_full(self):
+        if self.buffer.tell() >= buffer_size:
+            self.flush()
+
+    def flush(self):
+        with span("write", self.path, bytes=self.buffer.tell()):
+            self.file.write(self.buffer.getvalue())
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def number(value):
+    # missing months are nan in a Series, null in the output
+    return None if value != value else value
+
+
+# "|Dates and <column>||||" table with `table_columns` months per row
+def markdown_table(title, column, series):
+    lines = [f"###  {title} data table\n", f"|Dates and {column}||||\n", "| --- | --- | --- | --- |\n"]
+    cells = [f" {key}: {value} |" for key, value in series.items()]
+    for start in range(0, len(cells), table_columns):
+        row = cells[start:start + table_columns]
+        lines.append("|" + "".join(row) + "  |" * (table_columns - len(row)) + "\n")
+    return "".join(lines)
+
+
+# terminal version of the table, printed with one call
+def print_table(series):
+    cells = [f"{key}: {value}" for key, value in series.items()]
+    rows = ["\t" + "\t".join(cells[start:start + table_columns]) for start in range(0, len(cells), table_columns)]
+    print("\n".join(rows))
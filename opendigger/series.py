@@ -0,0 +1,76 @@
+import numpy as np
+
+
+def parse_month(key):
+    # "YYYY-MM" -> months since year 0, None for keys that are not a month
+    if len(key) != 7 or key[4] != "-" or not key[:4].isdigit() or not key[5:].isdigit():
+        return None
+    return int(key[:4]) * 12 + int(key[5:]) - 1
+
+
+def month_key(ordinal):
+    return f"{ordinal // 12:04d}-{ordinal % 12 + 1:02d}"
+
+
+def month_label(ordinal):
+    return f"{ordinal % 12 + 1:02d}/{ordinal // 12:04d}"
+
+
+# Monthly time series of one OpenDigger metric file: month ordinals (year * 12 + month - 1)
+# in ascending order and float64 values. Built once per file and shared by the charts
+# and tables; slicing works on the ordinals and never re-parses date strings.
+class Series:
+    def __init__(self, months, values, integer=None):
+        self.months = months
+        self.values = values
+        # which values were whole numbers in the file, so they print the same way
+        self.integer = integer if integer is not None else np.zeros(len(months), dtype=bool)
+
+    @classmethod
+    def from_json(cls, data):
+        months = []
+        values = []
+        integer = []
+        for key, value in data.items():
+            ordinal = parse_month(key)
+            if ordinal is not None:
+                months.append(ordinal)
+                values.append(np.nan if value is None else value)
+                integer.append(isinstance(value, int))
+        months = np.asarray(months, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        order = np.argsort(months, kind="stable")
+        return cls(months[order], values[order], np.asarray(integer, dtype=bool)[order])
+
+    def __len__(self):
+        return len(self.months)
+
+    def __getitem__(self, index):
+        return Series(self.months[index], self.values[index], self.integer[index])
+
+    # months between start and end ("YYYY-MM", both included, None for open ends)
+    def between(self, start=None, end=None):
+        lo = 0 if start is None else np.searchsorted(self.months, parse_month(start), side="left")
+        hi = len(self) if end is None else np.searchsorted(self.months, parse_month(end), side="right")
+        return self[lo:hi]
+
+    def last(self, count):
+        return self[max(len(self) - count, 0):]
+
+    # months kept by -from / -to / -last: the range first, then its last `count` months
+    def select(self, start=None, end=None, count=None):
+        series = self.between(start, end)
+        return series.last(count) if count is not None else series
+
+    def keys(self):
+        return [month_key(ordinal) for ordinal in self.months.tolist()]
+
+    def labels(self):
+        return [month_label(ordinal) for ordinal in self.months.tolist()]
+
+    # values as python numbers, int where the json file had an int
+    def value_list(self):
+        return [int(v) if i else v for v, i in zip(self.values.tolist(), self.integer.tolist())]
+
+    def items(self):
+        return zip(self.keys(), self.value_list())
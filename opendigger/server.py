@@ -0,0 +1,256 @@
+import sys
+import json
+import time
+import signal
+import threading
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from . import fetch
+from .cache import format_size
+
+refresh_workers = 2
+kinds = {"indexes": "index", "metrics": "metric"}
+
+
+# rough size in bytes of a parsed json value, used to bound the store
+def object_size(value):
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(key) + object_size(item) for key, item in value.items())
+    elif isinstance(value, list):
+        size += sum(object_size(item) for item in value)
+    return size
+
+
+class Entry:
+    def __init__(self, data):
+        self.data = data
+        # encoded once, full history responses are assembled from these bytes
+        self.encoded = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        self.size = object_size(data) + len(self.encoded)
+        self.loaded = time.monotonic()
+
+
+# In-memory LRU of parsed OpenDigger files, bounded by their approximate size in
+# bytes. Every url is loaded once even when many clients ask for it at the same
+# time; entries older than max_age keep being served while a background thread
+# loads them again with `reload` (`load` by default), so warm requests never wait
+# for the network.
+class JsonStore:
+    def __init__(self, load, max_size, max_age, reload=None):
+        self.load = load
+        self.reload = reload or load
+        self.max_size = max_size
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.loading = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresher = ThreadPoolExecutor(max_workers=refresh_workers)
+
+    # Entry of a url, loading errors are raised
+    def get(self, url):
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is not None:
+                self.entries.move_to_end(url)
+                self.hits += 1
+                if time.monotonic() - entry.loaded > self.max_age and url not in self.loading:
+                    self.loading[url] = Future()
+                    self.refresher.submit(self.refresh, url)
+                return entry
+            future = self.loading.get(url)
+            owner = future is None
+            if owner:
+                future = self.loading[url] = Future()
+                self.misses += 1
+        if owner:
+            try:
+                future.set_result(self.fill(url, self.load))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self.lock:
+                    self.loading.pop(url, None)
+        return future.result()
+
+    def fill(self, url, load):
+        entry = Entry(load(url))
+        with self.lock:
+            old = self.entries.pop(url, None)
+            if old is not None:
+                self.size -= old.size
+            self.entries[url] = entry
+            self.size += entry.size
+            while self.size > self.max_size and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.size
+        return entry
+
+    def refresh(self, url):
+        future = self.loading[url]
+        try:
+            entry = self.fill(url, self.reload)
+            with self.lock:
+                self.refreshes += 1
+            future.set_result(entry)
+        except Exception as e:
+            print(f"Background refresh of {url} failed: {e}")
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                self.loading.pop(url, None)
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.size, "max_bytes": self.max_size,
+                    "hits": self.hits, "misses": self.misses, "refreshes": self.refreshes}
+
+    def close(self):
+        self.refresher.shutdown(wait=False)
+
+
+class NotFound(Exception):
+    pass
+
+
+# loads one url through the fetch engine (cache, retries, rate limit) for the store,
+# files the server does not have are kept as None so they are not asked for again
+def load_url(url, revalidate=False):
+    result = fetch.fetch_engine.fetch(url, (lambda url: fetch.load_json(url, revalidate=True)) if revalidate else None)
+    if result.status == 404:
+        return None
+    if not result.ok:
+        raise RuntimeError(result.error)
+    return result.data
+
+
+# background refreshes ask the server whether the file changed (a conditional request,
+# as --refresh does) instead of reading back a cache entry that is still fresh
+def reload_url(url):
+    return load_url(url, revalidate=True)
+
+
+# one month of a file: the value of flat {"YYYY-MM": value} files, and for the
+# distribution files ({"avg": {...}, "levels": {...}, "quantile_0": {...}, ...}) the
+# month of every part; None when the file has no such month
+def month_value(data, month):
+    if not isinstance(data, dict):
+        return None
+    if month in data:
+        return data[month]
+    parts = {key: part.get(month) for key, part in data.items() if isinstance(part, dict)}
+    return parts if any(value is not None for value in parts.values()) else None
+
+
+# GET /repos/<owner>/<repo>/indexes/<name>[?month=YYYY-MM]
+# GET /repos/<owner>/<repo>/metrics/<name>[?month=YYYY-MM]
+# GET /stats, GET /health
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            if parts == ["health"]:
+                self.send_json(200, b'{"status":"ok"}')
+            elif parts == ["stats"]:
+                self.send_json(200, json.dumps(self.server.store.stats()).encode("utf-8"))
+            elif len(parts) == 5 and parts[0] == "repos" and parts[3] in kinds:
+                month = query.get("month", [None])[0]
+                body = self.server.api.query("/".join(parts[1:3]), parts[3], parts[4], month)
+                self.send_json(200, body)
+            else:
+                self.send_error_json(404, f"Unknown endpoint {url.path}")
+        except NotFound as e:
+            self.send_error_json(404, str(e))
+        except Exception as e:
+            self.send_error_json(502, str(e))
+
+    def send_json(self, code, body):
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, code, message):
+        self.send_json(code, json.dumps({"error": message}).encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+# Answers the indexes/metrics of the CLI with the files their handlers read, as
+# listed by the handler tables of open_digger
+class Api:
+    def __init__(self, open_digger, store, prefix, workers=fetch.default_workers):
+        self.open_digger = open_digger
+        self.store = store
+        self.prefix = prefix
+        # files of one query are loaded in parallel (--workers) when they are not in memory yet
+        self.loader = ThreadPoolExecutor(max_workers=max(workers, 1))
+
+    def query(self, repo_name, kind, name, month=None):
+        handlers = self.open_digger.indexes if kind == "indexes" else self.open_digger.metrics
+        if name not in handlers:
+            raise NotFound(f"Unknown {kinds[kind]} {name}, expected one of: {', '.join(handlers)}")
+        names = self.open_digger.handler_names(**{kinds[kind]: name})
+        files = [file for key in names for file in self.open_digger.handler_files(key)]
+        urls = [self.prefix + repo_name + "/" + file + ".json" for file in files]
+        entries = self.loader.map(self.store.get, urls) if len(urls) > 1 else map(self.store.get, urls)
+        parts = []
+        for file, entry in zip(files, entries):
+            if entry.data is None:
+                value = b"null"
+            elif month is not None:
+                value = json.dumps(month_value(entry.data, month)).encode("utf-8")
+            else:
+                value = entry.encoded
+            parts.append(json.dumps(file).encode("utf-8") + b":" + value)
+        head = {"repo": repo_name, kinds[kind]: name, "month": month}
+        return json.dumps(head).encode("utf-8")[:-1] + b',"files":{' + b",".join(parts) + b"}}"
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # many clients connect at once, the default backlog of 5 drops connections
+    request_queue_size = 128
+
+    def __init__(self, address, api):
+        super().__init__(address, ApiHandler)
+        self.api = api
+        self.store = api.store
+
+
+def stop(signum, frame):
+    raise KeyboardInterrupt
+
+
+# `opendigger serve`: runs until interrupted
+def serve(api, host, port):
+    store = api.store
+    server = ApiServer((host, port), api)
+    # stop cleanly on SIGTERM as well as Ctrl-C
+    signal.signal(signal.SIGTERM, stop)
+    print(f"Serving OpenDigger data on http://{host}:{server.server_port}/repos/<owner>/<repo>/indexes/<index> "
+          f"and /metrics/<metric> (memory {format_size(store.max_size)}, refresh after {store.max_age}s), Ctrl-C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        store.close()
+        api.loader.shutdown(wait=False)
+        stats = store.stats()
+        print(f"Served {stats['hits']} warm and {stats['misses']} cold file reads, "
+              f"{stats['entries']} files ({format_size(stats['bytes'])}) in memory")
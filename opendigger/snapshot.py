@@ -0,0 +1,142 @@
+import os
+import json
+import mmap
+import zlib
+import struct
+import threading
+import urllib.error
+from datetime import datetime
+
+from .cache import format_size, suffix_tmp
+from .timing import span
+
+snapshot_version = 1
+magic = b"ODSNAP1\n"
+# index offset, index length, end marker
+trailer = struct.Struct("<QQ8s")
+end_marker = b"ODSNAPIX"
+compression_level = 6
+
+
+# Offline bundle of OpenDigger files. Every file is stored as its own zlib stream,
+# followed by a compressed json index mapping "<owner>/<repo>/<file>.json" (the url
+# without the server prefix) to the offset, compressed and raw size of its stream:
+#
+#   magic | stream | stream | ... | index | trailer
+#
+# Snapshots are memory-mapped and only the requested files are decompressed, so
+# reading one metric of one repository does not depend on the size of the bundle.
+class Snapshot:
+    def __init__(self, path, prefix=""):
+        self.path = path
+        self.prefix = prefix
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"{path} is not an opendigger snapshot")
+        if self.data[:len(magic)] != magic or self.data[-len(end_marker):] != end_marker:
+            self.close()
+            raise ValueError(f"{path} is not an opendigger snapshot")
+        offset, length, _ = trailer.unpack(self.data[-trailer.size:])
+        self.index = json.loads(zlib.decompress(self.data[offset:offset + length]))
+        self.files = self.index["files"]
+        self.served = 0
+
+    def key(self, url):
+        return url[len(self.prefix):] if self.prefix and url.startswith(self.prefix) else url
+
+    # raw body of a url, None when the snapshot does not have it
+    def read(self, url):
+        entry = self.files.get(self.key(url))
+        if entry is None:
+            return None
+        offset, length, _ = entry
+        return zlib.decompress(self.data[offset:offset + length])
+
+    # parsed body of a url, missing files raise the error the server would give
+    def load_json(self, url):
+        with span("fetch", url, status="snapshot") as event:
+            body = self.read(url)
+            event["bytes"] = len(body) if body is not None else 0
+        if body is None:
+            raise urllib.error.HTTPError(url, 404, f"Not Found in snapshot {self.path}", None, None)
+        self.served += 1
+        with span("parse", url):
+            return json.loads(body)
+
+    def summary(self):
+        return f"Snapshot: {self.served} files read from {self.path} ({self.index.get('created', 'unknown date')})"
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+# Streams files into a new snapshot, written to a temporary file and moved in place on close
+class SnapshotWriter:
+    def __init__(self, path, prefix):
+        self.path = path
+        self.prefix = prefix
+        self.tmp_path = f"{path}.{os.getpid()}{suffix_tmp}"
+        self.file = open(self.tmp_path, "wb")
+        self.file.write(magic)
+        self.files = {}
+        self.repos = []
+        self.raw_size = 0
+        self.lock = threading.Lock()
+
+    def add(self, url, body):
+        compressed = zlib.compress(body, compression_level)
+        with self.lock:
+            self.files[url[len(self.prefix):] if url.startswith(self.prefix) else url] = \
+                [self.file.tell(), len(compressed), len(body)]
+            self.file.write(compressed)
+            self.raw_size += len(body)
+
+    def close(self):
+        index = {
+            "version": snapshot_version,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "prefix": self.prefix,
+            "repos": self.repos,
+            "files": self.files,
+        }
+        compressed = zlib.compress(json.dumps(index).encode("utf-8"), compression_level)
+        offset = self.file.tell()
+        self.file.write(compressed)
+        self.file.write(trailer.pack(offset, len(compressed), end_marker))
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.tmp_path)
+
+    def summary(self):
+        size = os.path.getsize(self.path)
+        return (f"Snapshot: {len(self.files)} files of {len(self.repos)} repositories written to {self.path} "
+                f"({format_size(self.raw_size)}, {format_size(size)} compressed)")
+
+
+# Downloads every file of every repository (through the cache and the retrying fetch
+# engine) into a snapshot at path; files the server does not have are left out.
+def export_snapshot(path, repos, plan_urls, fetch_engine, workers, prefix):
+    writer = SnapshotWriter(path, prefix)
+    try:
+        for repo_name in repos:
+            stored, missing = 0, 0
+            for result in fetch_engine.fetch_all(plan_urls(repo_name), workers):
+                if result.ok and result.data is not None:
+                    writer.add(result.url, json.dumps(result.data, separators=(",", ":")).encode("utf-8"))
+                    stored += 1
+                else:
+                    missing += 1
+            writer.repos.append(repo_name)
+            print(f"{repo_name}: {stored} files" + (f", {missing} not available" if missing else ""))
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    print(writer.summary())
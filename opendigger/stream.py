@@ -0,0 +1,108 @@
+import json
+
+json_decoder = json.JSONDecoder()
+whitespace = " \t\n\r"
+delimiters = ",:}"
+
+
+# Incremental parser for a top-level {"key": value, ...} json object arriving in
+# byte chunks. Members are yielded as (key, value, start, end), start/end being the
+# byte range of the value in the body, and only the current member is kept in
+# memory, so a caller looking for one month can stop reading as soon as it is found.
+# The text is decoded as latin-1 so positions are byte offsets (as in the cache's
+# month index); values with non-ascii characters are decoded again as utf-8.
+class MemberReader:
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.text = ""
+        # byte offset of self.text[0] in the body
+        self.base = 0
+        self.eof = False
+
+    def fill(self, need=1):
+        # read until at least `need` more characters are buffered, False at the end of the body
+        wanted = len(self.text) + need
+        while len(self.text) < wanted:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.eof = True
+                return False
+            self.text += chunk.decode("latin-1")
+        return True
+
+    def skip(self, i):
+        while True:
+            while i < len(self.text) and self.text[i] in whitespace:
+                i += 1
+            if i < len(self.text) or not self.fill():
+                return i
+
+    def expect(self, i, chars):
+        i = self.skip(i)
+        if i >= len(self.text) or self.text[i] not in chars:
+            raise ValueError(f"expected {chars!r} at byte {self.base + i}")
+        return i, self.text[i]
+
+    # a whole json value at i: a number cut by a chunk boundary ("42." of "42.5") also
+    # decodes, so values are only accepted once the delimiter after them was read
+    def decode(self, i):
+        while True:
+            try:
+                value, end = json_decoder.raw_decode(self.text, i)
+                if self.eof or self.delimited(end):
+                    break
+            except ValueError:
+                if self.eof:
+                    raise
+            # grow geometrically so one large value is decoded a bounded number of times
+            self.fill(max(len(self.text) - i, 1024))
+        if not self.text[i:end].isascii():
+            value = json.loads(self.text[i:end].encode("latin-1"))
+        return value, end
+
+    def delimited(self, i):
+        while i < len(self.text) and self.text[i] in whitespace:
+            i += 1
+        return i < len(self.text) and self.text[i] in delimiters
+
+    # drops the parsed part of the buffer
+    def compact(self, i):
+        if i > len(self.text) // 2:
+            self.base += i
+            self.text = self.text[i:]
+            return 0
+        return i
+
+    def members(self):
+        try:
+            i, _ = self.expect(0, "{")
+            i = self.skip(i + 1)
+            if i < len(self.text) and self.text[i] == "}":
+                return
+            while True:
+                i = self.compact(i)
+                key, i = self.decode(self.skip(i))
+                i, _ = self.expect(i, ":")
+                start = self.skip(i + 1)
+                value, end = self.decode(start)
+                yield key, value, self.base + start, self.base + end
+                i, char = self.expect(end, ",}")
+                if char == "}":
+                    return
+                i += 1
+        finally:
+            close = getattr(self.chunks, "close", None)
+            if close is not None:
+                close()
+
+
+def iter_members(chunks):
+    return MemberReader(chunks).members()
+
+
+# (found, value) of one key, reading no further than that key
+def find_member(chunks, wanted):
+    for key, value, _, _ in iter_members(chunks):
+        if key == wanted:
+            return True, value
+    return False, None
@@ -0,0 +1,98 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+from .cache import format_size
+
+default_trace_file = "opendigger-trace.json"
+# phases in the order they are listed in the summary
+phases = ["cache", "fetch", "parse", "display", "plot", "render", "write"]
+
+
+# Records how long every phase of a run takes (--profile): cache reads and downloads
+# per url with their size and status, json parsing, terminal plots, report charts
+# and file writes; "display" spans cover a whole handler and include the others.
+# Events are kept as Chrome trace events ("X" complete events, microseconds), so
+# the trace opens in chrome://tracing or Perfetto.
+class Tracer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.events = []
+
+    @contextmanager
+    def span(self, phase, name, **args):
+        # callers can add args (sizes, cache status) to the yielded dict while the span runs
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.add(phase, name, start, time.perf_counter() - start, args)
+
+    # `pid` is given for spans measured in another process (chart workers)
+    def add(self, phase, name, start, duration, args=None, pid=None):
+        event = {
+            "name": name,
+            "cat": phase,
+            "ph": "X",
+            "ts": round((start - self.origin) * 1e6, 1),
+            "dur": round(duration * 1e6, 1),
+            "pid": pid or os.getpid(),
+            "tid": threading.get_ident() if pid is None else 0,
+            "args": args or {},
+        }
+        with self.lock:
+            self.events.append(event)
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+    def summary(self):
+        totals = {}
+        for event in self.events:
+            phase = totals.setdefault(event["cat"], {"count": 0, "time": 0.0, "bytes": 0, "status": {}})
+            phase["count"] += 1
+            phase["time"] += event["dur"] / 1000
+            phase["bytes"] += event["args"].get("bytes", 0)
+            status = event["args"].get("status")
+            if status:
+                phase["status"][status] = phase["status"].get(status, 0) + 1
+        lines = ["Profile (time summed over threads and processes, display includes the other phases):",
+                 f"\t{'phase':<10} {'count':>7} {'total ms':>10} {'max ms':>10} {'bytes':>10}  details"]
+        for name in sorted(totals, key=lambda name: phases.index(name) if name in phases else len(phases)):
+            phase = totals[name]
+            longest = max(event["dur"] for event in self.events if event["cat"] == name) / 1000
+            details = ", ".join(f"{count} {status}" for status, count in phase["status"].items())
+            lines.append(f"\t{name:<10} {phase['count']:>7} {phase['time']:>10.1f} {longest:>10.1f} "
+                         f"{format_size(phase['bytes']):>10}  {details}")
+        slowest = sorted((event for event in self.events if event["cat"] == "fetch"), key=lambda e: -e["dur"])[:5]
+        if slowest:
+            lines.append("Slowest fetches:")
+            lines += [f"\t{event['dur'] / 1000:>8.1f} ms  {event['args'].get('status', '')}  {event['name']}"
+                      for event in slowest]
+        return "\n".join(lines)
+
+
+# disabled tracer: spans cost one function call and record nothing
+class NullTracer:
+    @contextmanager
+    def span(self, phase, name, **args):
+        yield args
+
+    def add(self, phase, name, start, duration, args=None, pid=None):
+        pass
+
+
+tracer = NullTracer()
+
+
+def set_tracer(new_tracer):
+    global tracer
+    tracer = new_tracer
+
+
+def span(phase, name, **args):
+    return tracer.span(phase, name, **args)
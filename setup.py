@@ -3,9 +3,10 @@ from setuptools import setup, find_packages
 setup(
     name="opendigger",
     version="0.1.7",
-    packages=find_packages(),
+    packages=find_packages(exclude=["tests", "tests.*"]),
+    python_requires=">=3.9",
     install_requires=[
-        "numpy",
+        "numpy>=1.20",
         "plotext",
         "matplotlib",
     ],
@@ -23,9 +24,9 @@ setup(
         "Intended Audience :: Developers",
         "License :: OSI Approved :: MIT License",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
-        "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
+        "Programming Language :: Python :: 3.12",
     ],
 )
\ No newline at end of file
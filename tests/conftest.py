@@ -0,0 +1,23 @@
+import pytest
+
+from benchmarks.mock_server import MockServer
+from opendigger import fetch
+
+
+@pytest.fixture
+def server():
+    mock = MockServer(0, months=24).start()
+    yield mock
+    mock.shutdown()
+    mock.server_close()
+
+
+# fetch keeps its cache, snapshot and memo in module globals, every test starts without them
+@pytest.fixture(autouse=True)
+def fetch_state():
+    yield
+    fetch.set_response_cache(None)
+    fetch.set_snapshot(None)
+    fetch.memo.clear()
+    fetch.series_memo.clear()
+    fetch.failures.clear()
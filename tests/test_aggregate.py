@@ -0,0 +1,84 @@
+import numpy as np
+
+from opendigger import opendigger as od
+from opendigger.aggregate import align, moving_average, summarize, top_k
+from opendigger.series import Series, parse_month
+
+
+def series(start, values):
+    return Series(np.arange(parse_month(start), parse_month(start) + len(values), dtype=np.int64),
+                  np.asarray(values, dtype=np.float64))
+
+
+def test_align_fills_missing_months_with_nan():
+    month_axis, matrix = align([series("2023-01", [1, 2]), None, series("2023-02", [5, 6])])
+    assert month_axis.tolist() == [parse_month("2023-01"), parse_month("2023-02"), parse_month("2023-03")]
+    assert matrix.shape == (3, 3)
+    np.testing.assert_array_equal(matrix[0], [1, 2, np.nan])
+    assert np.isnan(matrix[1]).all()
+    np.testing.assert_array_equal(matrix[2], [np.nan, 5, 6])
+
+
+def test_align_without_data():
+    month_axis, matrix = align([None, None])
+    assert len(month_axis) == 0
+    assert matrix.shape == (2, 0)
+
+
+def test_moving_average_ignores_missing_months():
+    matrix = np.array([[1.0, 2.0, np.nan, 4.0]])
+    np.testing.assert_array_equal(moving_average(matrix, 2), [[np.nan, 1.5, 2.0, 4.0]])
+
+
+def test_summarize_uses_the_latest_month():
+    matrix = np.array([[1.0, 2.0, 3.0, 8.0], [4.0, 4.0, 4.0, 2.0]])
+    stats = summarize(matrix, 2, 2)
+    np.testing.assert_array_equal(stats["latest"], [8.0, 2.0])
+    np.testing.assert_array_equal(stats["growth"], [6.0, -2.0])
+    np.testing.assert_array_equal(stats["growth-rate"], [300.0, -50.0])
+    np.testing.assert_array_equal(stats["mean"], [5.5, 3.0])
+    np.testing.assert_array_equal(stats["moving-average"], [5.5, 3.0])
+
+
+def test_summarize_without_months():
+    stats = summarize(np.full((2, 0), np.nan), 12, 3)
+    assert all(np.isnan(values).all() and len(values) == 2 for values in stats.values())
+    assert top_k(stats["growth"], 5) == []
+
+
+def test_rank_without_data(server, monkeypatch, capsys):
+    monkeypatch.setattr(od, "prefix", server.prefix)
+    od.OpenDigger().run_rank(["missing/a", "missing/b"])
+    od.OpenDigger().run_rank([])
+    assert "Portfolio openrank percentiles across 0 repositories" in capsys.readouterr().out
+
+
+def test_top_k_skips_missing_values():
+    values = np.array([3.0, np.nan, 7.0, 1.0, 5.0])
+    assert top_k(values, 3) == [2, 4, 0]
+    assert top_k(values, 10) == [2, 4, 0, 3]
+    assert top_k(values, 0) == []
+    assert top_k(np.array([np.nan]), 2) == []
+
+
+def test_top_k_matches_a_full_sort():
+    values = np.random.default_rng(0).random(1000)
+    values[::7] = np.nan
+    expected = [row for row in np.argsort(-values, kind="stable") if not np.isnan(values[row])][:25]
+    assert top_k(values, 25) == expected
+
+
+def test_rank_scores_the_latest_month(server, monkeypatch, capsys):
+    monkeypatch.setattr(od, "prefix", server.prefix)
+    od.OpenDigger().run_rank(["a/b", "c/d"], months=3)
+    out = capsys.readouterr().out
+    assert out.rstrip().splitlines()[-1].split()[0] == "2023-12"
+
+
+def test_tuning_options_before_a_command_are_kept():
+    args = od.make_parser().parse_args(["--rate", "2", "--no-cache", "rank", "-repos-file", "repos.txt"])
+    assert (args.rate, args.no_cache) == (2.0, True)
+    args = od.make_parser().parse_args(["rank", "-repos-file", "repos.txt", "--rate", "3"])
+    assert args.rate == 3.0
+    args = od.make_parser().parse_args(["serve"])
+    assert (args.rate, args.workers, args.no_cache) == (od.default_rate, od.default_workers, False)
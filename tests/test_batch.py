@@ -0,0 +1,65 @@
+import io
+import urllib.error
+
+from opendigger import fetch
+from opendigger import opendigger as od
+from opendigger.batch import read_repo_list, run_batch
+from opendigger.engine import FetchEngine
+
+
+def test_read_repo_list(tmp_path):
+    path = tmp_path / "repos.txt"
+    path.write_text("a/b\n\n# comment\nc/d  # trailing comment\n")
+    assert read_repo_list(str(path)) == ["a/b", "c/d"]
+
+
+def test_read_repo_list_from_stdin(monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO("a/b\nc/d\n"))
+    assert read_repo_list("-") == ["a/b", "c/d"]
+
+
+class FakeOpenDigger:
+    def __init__(self, failing):
+        self.failing = failing
+        self.displayed = []
+
+    def plan_urls(self, repo_name, index, metric, month):
+        return []
+
+    def repo_prefix(self, repo_name):
+        return repo_name + "/"
+
+    def run_repo(self, repo_name, index, metric, month, download_type, workers, report):
+        if repo_name in self.failing:
+            raise RuntimeError("broken")
+        self.displayed.append(repo_name)
+
+
+def test_a_failing_repo_does_not_stop_the_batch(capsys):
+    open_digger = FakeOpenDigger({"c/d"})
+    succeeded, failed = run_batch(open_digger, ["a/b", "c/d", "e/f"], "openrank", None, concurrency=2)
+    assert open_digger.displayed == ["a/b", "e/f"]
+    assert succeeded == ["a/b", "e/f"]
+    assert failed == {"c/d": "RuntimeError: broken"}
+    assert "2/3 repositories succeeded" in capsys.readouterr().out
+
+
+def test_repos_missing_data_are_failed(server, monkeypatch, capsys):
+    monkeypatch.setattr(od, "prefix", server.prefix)
+    monkeypatch.setattr(od, "plotext_plot", lambda *args, **kwargs: None)
+    succeeded, failed = run_batch(od.OpenDigger(), ["a/b", "missing/repo"], "all", None)
+    assert succeeded == ["a/b"]
+    assert failed == {"missing/repo": "no data: all 3 files were not found"}
+
+    def load(url):
+        raise urllib.error.URLError("connection refused")
+
+    engine = FetchEngine(load, retries=0)
+    monkeypatch.setattr(fetch, "fetch_engine", engine)
+    try:
+        succeeded, failed = run_batch(od.OpenDigger(), ["c/d"], "openrank", None)
+    finally:
+        engine.close()
+    assert failed == {"c/d": "1 downloads failed, first: URLError: connection refused"}
+    assert fetch.failures == {}
+    assert "0/1 repositories succeeded" in capsys.readouterr().out
@@ -0,0 +1,95 @@
+import os
+import time
+
+from opendigger import fetch
+from opendigger.cache import ResponseCache, month_offsets
+
+
+url = "https://example.org/open_digger/github/a/b/openrank.json"
+body = b'{"2023-01": 1.5, "2023-02": [1, 2], "2023-03": {"x": "\xc3\xa9"}}'
+
+
+def test_put_then_lookup(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put(url, body, etag='"e1"', last_modified="Mon, 01 May 2023 00:00:00 GMT")
+    cached, meta = cache.lookup(url)
+    assert cached == body
+    assert meta["etag"] == '"e1"'
+    assert meta["size"] == len(body)
+    assert cache.lookup(url)[0] == body
+
+
+def test_missing_entry(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    assert cache.lookup(url) == (None, None)
+    assert cache.lookup(url)[0] is None
+
+
+def test_expired_entry_is_not_fresh(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    cache.put(url, body)
+    _, meta = cache.lookup(url)
+    assert cache.is_fresh(meta)
+    meta["fetched"] = time.time() - 120
+    assert not cache.is_fresh(meta)
+    cache.touch(url, meta)
+    assert cache.is_fresh(cache.read_meta(url))
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_size=2 * len(body))
+    urls = [f"{url}?{i}" for i in range(3)]
+    for i, u in enumerate(urls[:2]):
+        cache.put(u, body)
+        body_path, _ = cache.entry_paths(u)
+        os.utime(body_path, (i, i))
+    cache.put(urls[2], body)
+    assert cache.lookup(urls[0])[0] is None
+    assert cache.lookup(urls[1])[0] == body
+    assert cache.lookup(urls[2])[0] == body
+
+
+def test_discard(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put(url, body)
+    cache.discard(url)
+    assert cache.lookup(url)[0] is None
+    assert cache.entries() == []
+
+
+def test_no_temporary_files_are_left(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put(url, body)
+    names = [name for _, _, files in os.walk(tmp_path) for name in files]
+    assert not [name for name in names if name.endswith(".tmp")]
+
+
+def test_month_offsets_are_byte_ranges():
+    offsets = month_offsets(body)
+    assert list(offsets) == ["2023-01", "2023-02", "2023-03"]
+    start, end = offsets["2023-03"]
+    assert body[start:end].decode("utf-8") == '{"x": "é"}'
+
+
+def test_month_offsets_of_other_json():
+    assert month_offsets(b"[1, 2]") is None
+    assert month_offsets(b"{}") == {}
+    assert month_offsets(b'{"a": 1') is None
+
+
+def test_read_month_uses_the_index(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put(url, body)
+    assert cache.read_month(url, "2023-02") == (True, [1, 2])
+    assert cache.read_month(url, "2030-01") == (True, None)
+    cache.put(url, b"[1, 2]")
+    assert cache.read_month(url, "2023-02") == (False, None)
+
+
+def test_month_query_reads_the_cached_month(server, tmp_path):
+    fetch.set_response_cache(ResponseCache(str(tmp_path)))
+    file_url = server.prefix + "a/b/openrank.json"
+    history = fetch.load_json(file_url)
+    month = sorted(history)[3]
+    assert fetch.get_json_data(file_url, month) == history[month]
+    assert server.requests == 1
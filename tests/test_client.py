@@ -0,0 +1,65 @@
+import json
+import urllib.error
+
+import pytest
+
+from opendigger.client import HTTPClient
+
+
+def pool_key(client):
+    (key,) = client.idle
+    return key
+
+
+def test_get_reuses_the_connection(server):
+    client = HTTPClient(pool_size=2)
+    first = client.get(server.prefix + "a/b/openrank.json")
+    assert first.status == 200
+    assert isinstance(json.loads(first.read()), dict)
+    key = pool_key(client)
+    connection = client.idle[key][0]
+    client.get(server.prefix + "a/b/activity.json")
+    assert client.idle[key] == [connection]
+    client.close()
+
+
+def test_http_errors_are_raised(server):
+    client = HTTPClient()
+    with pytest.raises(urllib.error.HTTPError) as error:
+        client.get(server.prefix + "missing/repo/openrank.json")
+    assert error.value.code == 404
+    # the empty error body was read, the connection can be used again
+    assert len(client.idle[pool_key(client)]) == 1
+    client.close()
+
+
+def test_not_modified_is_raised(server):
+    client = HTTPClient()
+    etag = client.get(server.prefix + "a/b/openrank.json").headers["ETag"]
+    with pytest.raises(urllib.error.HTTPError) as error:
+        client.get(server.prefix + "a/b/openrank.json", {"If-None-Match": etag})
+    assert error.value.code == 304
+    client.close()
+
+
+def test_connection_errors_are_url_errors():
+    client = HTTPClient(timeout=1)
+    with pytest.raises(urllib.error.URLError):
+        client.get("http://127.0.0.1:1/open_digger/github/a/b/openrank.json")
+
+
+def test_stream_read_to_the_end_returns_the_connection(server):
+    client = HTTPClient()
+    with client.open(server.prefix + "a/b/active_dates_times.json") as stream:
+        body = b"".join(stream.chunks(16))
+    assert isinstance(json.loads(body), dict)
+    assert len(client.idle[pool_key(client)]) == 1
+    client.close()
+
+
+def test_stream_closed_early_drops_the_connection(server):
+    client = HTTPClient()
+    with client.open(server.prefix + "a/b/active_dates_times.json") as stream:
+        next(stream.chunks(16))
+    assert client.idle[pool_key(client)] == []
+    client.close()
@@ -0,0 +1,70 @@
+import numpy as np
+
+from opendigger import opendigger as od
+from opendigger.derived import Distribution, derive, deltas, markdown_derived, ratios, rolling_median
+from opendigger.report import ReportWriter
+from opendigger.series import Series
+
+nan = np.nan
+response = {
+    "avg": {"2023-01": 2.0, "2023-02": 3.0, "2023-03": 4.0},
+    "levels": {"2023-01": [1, 2, 3, 4], "2023-03": [0, None, 5, 1]},
+    **{f"quantile_{q}": {"2023-01": q, "2023-02": q + 1, "2023-03": q + 2} for q in range(5)},
+}
+
+
+def test_distribution_from_json():
+    distribution = Distribution.from_json(response)
+    assert distribution.keys() == ["2023-01", "2023-02", "2023-03"]
+    np.testing.assert_array_equal(distribution.avg, [2.0, 3.0, 4.0])
+    np.testing.assert_array_equal(distribution.levels, [[1, 2, 3, 4], [nan] * 4, [0, nan, 5, 1]])
+    np.testing.assert_array_equal(distribution.median, [2, 3, 4])
+    np.testing.assert_array_equal(distribution.stacks()[0], [0, 1, 3, 6])
+    assert Distribution.from_json(None) is None
+    assert Distribution.from_json({"2023-01": 1}) is None
+
+
+def test_rolling_median_deltas_and_ratios():
+    np.testing.assert_array_equal(rolling_median(np.array([1.0, 5.0, 3.0, nan, 9.0]), 3), [nan, nan, 3.0, 4.0, 6.0])
+    np.testing.assert_array_equal(rolling_median(np.array([4.0]), 3), [4.0])
+    np.testing.assert_array_equal(deltas(np.array([1.0, 4.0, 2.0])), [nan, 3.0, -2.0])
+    assert len(deltas(np.zeros(0))) == 0
+    np.testing.assert_array_equal(ratios(np.array([1.0, 2.0]), np.array([2.0, 0.0])), [0.5, nan])
+
+
+def test_derive_aligns_every_column():
+    opened = Series.from_json({"2023-01": 10, "2023-02": 20, "2023-03": 5})
+    closed = Series.from_json({"2023-02": 10, "2023-03": 10})
+    columns = derive(opened, closed, Distribution.from_json(response), None, window=2)
+    assert list(columns) == ["opened", "closed", "closed/opened", "Δ opened", "response median",
+                             "response 2m median", "resolution median", "Δ resolution"]
+    assert all(series.keys() == ["2023-01", "2023-02", "2023-03"] for series in columns.values())
+    np.testing.assert_array_equal(columns["closed/opened"].values, [nan, 0.5, 2.0])
+    np.testing.assert_array_equal(columns["Δ opened"].values, [nan, 10, -15])
+    np.testing.assert_array_equal(columns["response 2m median"].values, [nan, 2.5, 3.5])
+    assert np.isnan(columns["resolution median"].values).all()
+
+
+def test_markdown_table():
+    opened = Series.from_json({"2023-01": 10, "2023-02": 20})
+    lines = markdown_derived("PR", derive(opened, opened, None, None)).splitlines()
+    assert lines[0] == "###  PR derived metrics"
+    assert lines[1].startswith("| month | opened | closed | closed/opened |")
+    assert lines[3].startswith("| 2023-01 | 10.00 | 10.00 | 1.00 | - |")
+    assert len(lines) == 5
+
+
+def test_report_holds_the_latest_month_and_the_terminal_nothing(server, monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(od, "prefix", server.prefix)
+    path = tmp_path / "OpenDiggerInfo.md"
+    with ReportWriter(str(path)) as f:
+        for title, opened, closed in [("Issues", "issues_new", "issues_closed"),
+                                      ("PR", "change_requests", "change_requests_accepted")]:
+            od.OpenDigger().display_derived("a/b", title, opened, closed, None, None, None, f, True)
+    report = path.read_text()
+    assert report.count("derived metrics") == 2
+    assert "| 2023-12 |" in report
+    assert "| 2022-12 |" not in report
+    assert "derived metrics" not in capsys.readouterr().out
+    od.OpenDigger().display_derived("a/b", "PR", "change_requests", "change_requests_accepted", None, None)
+    assert "PR derived metrics:" in capsys.readouterr().out
@@ -0,0 +1,103 @@
+import time
+import socket
+import urllib.error
+
+from opendigger import fetch
+from opendigger.cache import ResponseCache
+from opendigger.client import HTTPClient
+from opendigger.engine import FetchEngine, RateLimiter
+
+
+def http_error(code):
+    return urllib.error.HTTPError("https://x/a.json", code, "error", {}, None)
+
+
+def flaky(failures):
+    calls = []
+
+    def load(url):
+        calls.append(url)
+        if len(calls) <= failures:
+            raise http_error(503)
+        return {"url": url}
+
+    return load, calls
+
+
+def test_server_errors_are_retried():
+    load, calls = flaky(2)
+    engine = FetchEngine(load, retries=3, backoff=0.001)
+    result = engine.fetch("https://x/a.json")
+    assert result.ok and result.data == {"url": "https://x/a.json"}
+    assert result.attempts == 3 == len(calls)
+
+
+def test_retries_give_up():
+    load, calls = flaky(10)
+    result = FetchEngine(load, retries=2, backoff=0.001).fetch("https://x/a.json")
+    assert not result.ok
+    assert result.status == 503
+    assert len(calls) == 3
+
+
+def test_client_errors_are_not_retried():
+    def load(url):
+        raise http_error(404)
+
+    result = FetchEngine(load, retries=3, backoff=0.001).fetch("https://x/a.json")
+    assert (result.status, result.attempts) == (404, 1)
+    assert result.error.startswith("HTTPError: 404")
+
+
+def test_socket_timeouts_are_retried():
+    calls = []
+
+    def load(url):
+        calls.append(url)
+        raise socket.timeout("timed out")
+
+    result = FetchEngine(load, retries=1, backoff=0.001).fetch("https://x/a.json")
+    assert result.error == "TimeoutError: https://x/a.json"
+    assert len(calls) == 2
+
+
+def test_waiting_for_a_worker_or_a_rate_slot_is_not_a_timeout(server):
+    client = HTTPClient(timeout=0.2)
+    engine = FetchEngine(lambda url: engine.limiter.wait() or client.get(url).status, rate=20, retries=0, workers=2)
+    urls = [server.prefix + f"a/b/{i}.json" for i in range(10)]
+    start = time.monotonic()
+    try:
+        results = engine.fetch_all(urls, 8)
+    finally:
+        engine.close()
+        client.close()
+    assert [result.data for result in results] == [200] * 10
+    # 10 requests at 20 per second, several times the 0.2 second timeout
+    assert time.monotonic() - start > 0.4
+
+
+def test_fetch_all_keeps_the_order_of_the_urls():
+    load, _ = flaky(1)
+    urls = [f"https://x/{i}.json" for i in range(5)]
+    results = FetchEngine(load, backoff=0.001).fetch_all(urls, 3)
+    assert [result.url for result in results] == urls
+    assert all(result.ok for result in results)
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rate=100)
+    delays = [limiter.reserve() for _ in range(3)]
+    assert delays[0] == 0
+    assert 0.015 < delays[2] <= 0.02
+    assert RateLimiter(rate=0).reserve() == 0
+
+
+def test_cache_hits_are_not_rate_limited(server, tmp_path, monkeypatch):
+    fetch.set_response_cache(ResponseCache(str(tmp_path)))
+    url = server.prefix + "a/b/openrank.json"
+    fetch.load_json(url)
+    monkeypatch.setattr(fetch, "fetch_engine", FetchEngine(fetch.load_json, rate=1))
+    start = time.monotonic()
+    for _ in range(5):
+        assert fetch.fetch_engine.fetch(url).ok
+    assert time.monotonic() - start < 0.5
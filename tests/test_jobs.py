@@ -0,0 +1,74 @@
+import os
+import json
+import urllib.error
+
+from opendigger import fetch
+from opendigger import jobs
+from opendigger import opendigger as od
+from opendigger.engine import FetchEngine
+from opendigger.jobs import Journal
+
+options = {"index": "openrank", "format": "md"}
+
+
+def parse(tmp_path, *extra):
+    return od.make_parser().parse_args(["-repos-file", "repos.txt", "-index", "openrank", "-d", "md",
+                                        "-output-dir", str(tmp_path), "--no-cache", "--render-workers", "1"]
+                                       + list(extra))
+
+
+def test_journal_keeps_the_repositories_done_with_the_same_options(tmp_path):
+    path = str(tmp_path / "journal" / "run.jsonl")
+    journal = Journal(path, options)
+    journal.record("a/b", None, 1.0)
+    journal.record("c/d", "URLError: timed out", 2.0)
+    journal.close()
+    assert Journal(path, options).done == {"a/b"}
+    assert Journal(path, dict(options, format="csv")).done == set()
+    entries = [json.loads(line) for line in open(path)]
+    assert [(entry["repo"], entry["status"]) for entry in entries] == [("a/b", "done"), ("c/d", "failed")]
+    assert entries[1]["error"] == "URLError: timed out"
+
+
+def test_journal_ignores_a_torn_last_line(tmp_path):
+    path = tmp_path / "run.jsonl"
+    line = json.dumps({"repo": "a/b", "status": "done", "options": options})
+    path.write_text(line + "\n" + line.replace("a/b", "c/d")[:20])
+    journal = Journal(str(path), options)
+    assert journal.done == {"a/b"}
+    journal.record("e/f", None, 0.5)
+    journal.close()
+    assert Journal(str(path), options).done == {"a/b", "e/f"}
+
+
+def test_failed_downloads_fail_the_job(server, monkeypatch, tmp_path):
+    monkeypatch.setattr(od, "prefix", server.prefix)
+    monkeypatch.setattr(jobs, "worker", (od.OpenDigger(str(tmp_path)), parse(tmp_path)))
+    assert jobs.run_job("a/b")[:2] == ("a/b", None)
+    assert os.path.exists(tmp_path / "a" / "b" / "OpenDiggerInfo.md")
+    assert jobs.run_job("missing/repo")[:2] == ("missing/repo", "no data: all 1 files were not found")
+
+    def load(url):
+        raise urllib.error.URLError("connection refused")
+
+    engine = FetchEngine(load, retries=0)
+    monkeypatch.setattr(fetch, "fetch_engine", engine)
+    try:
+        repo_name, error, _ = jobs.run_job("c/d")
+    finally:
+        engine.close()
+    assert repo_name == "c/d"
+    assert error == "1 downloads failed, first: URLError: connection refused"
+
+
+def test_resumed_run_skips_the_repositories_done(server, tmp_path, capsys):
+    args = parse(tmp_path, "--processes", "2")
+    journal = str(tmp_path / od.default_journal)
+    succeeded, failed = jobs.run_jobs(["a/b", "c/d"], args, server.prefix, journal)
+    assert (sorted(succeeded), failed) == (["a/b", "c/d"], {})
+    assert os.path.exists(tmp_path / "c" / "d" / "OpenDiggerInfo.md")
+    requests = server.requests
+    succeeded, failed = jobs.run_jobs(["a/b", "c/d", "e/f"], args, server.prefix, journal)
+    assert (succeeded, failed) == (["e/f"], {})
+    assert server.requests == requests + 1
+    assert "Generating 1 reports in 2 processes, 2 already done" in capsys.readouterr().out
@@ -0,0 +1,22 @@
+import sys
+import subprocess
+
+heavy_modules = ["numpy", "plotext", "matplotlib"]
+
+
+# a fresh interpreter, the test process itself may already have imported numpy
+def imported_after(code):
+    script = code + "\nimport sys\nprint('modules: ' + ' '.join(sorted(m for m in " + repr(heavy_modules) + " if m in sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    # the last line, --help prints its usage before it
+    return output.splitlines()[-1].split()[1:]
+
+
+def test_cli_module_does_not_import_plotting_backends():
+    assert imported_after("import opendigger.opendigger") == []
+
+
+def test_help_does_not_import_plotting_backends():
+    code = ("import sys\nsys.argv = ['opendigger', '-h']\nfrom opendigger.opendigger import main\n"
+            "try:\n    main()\nexcept SystemExit:\n    pass")
+    assert imported_after(code) == []
@@ -0,0 +1,82 @@
+import numpy as np
+
+from opendigger.network import Graph
+
+data = {
+    "nodes": [["a", 3.0], ["b", 2.0], ["c", 1.0], ["a", 9.0], ["d", 0.5]],
+    "edges": [["a", "b", 2.0], ["b", "c", 1.0], ["a", "c", 4.0], ["c", "c", 0.5], ["a", "e", 1.0]],
+}
+
+
+def neighbours(graph, name):
+    node = graph.names.index(name)
+    start, end = graph.indptr[node], graph.indptr[node + 1]
+    return sorted((graph.names[other], weight) for other, weight in
+                  zip(graph.indices[start:end].tolist(), graph.weights[start:end].tolist()))
+
+
+def test_from_json_builds_csr_in_both_directions():
+    graph = Graph.from_json(data)
+    # duplicate nodes keep their first weight, nodes only named by an edge are added
+    assert graph.names == ["a", "b", "c", "d", "e"]
+    assert graph.node_weights.tolist() == [3.0, 2.0, 1.0, 0.5, 0.0]
+    assert graph.indptr.tolist() == [0, 3, 5, 8, 8, 9]
+    assert neighbours(graph, "a") == [("b", 2.0), ("c", 4.0), ("e", 1.0)]
+    assert neighbours(graph, "c") == [("a", 4.0), ("b", 1.0), ("c", 0.5)]
+    assert neighbours(graph, "d") == []
+
+
+def test_counts():
+    graph = Graph.from_json(data)
+    assert len(graph) == 5
+    assert graph.self_loops() == 1
+    assert graph.edge_count == 5
+    assert graph.degree().tolist() == [3, 2, 3, 0, 1]
+    np.testing.assert_allclose(graph.strength(), [7.0, 3.0, 5.5, 0.0, 1.0])
+
+
+def test_empty_graph():
+    graph = Graph.from_json({})
+    assert len(graph) == 0
+    assert graph.edge_count == 0
+    assert graph.pagerank().tolist() == []
+    assert graph.top_nodes(graph.pagerank()) == []
+
+
+def test_top_neighbours():
+    graph = Graph.from_json(data)
+    assert graph.top_neighbours(0, 2) == [(2, 4.0), (1, 2.0)]
+
+
+def test_pagerank_matches_the_dense_power_iteration():
+    graph = Graph.from_json(data)
+    rank = graph.pagerank(tolerance=1e-12, iterations=1000)
+    n = len(graph)
+    matrix = np.zeros((n, n))
+    for node in range(n):
+        for other, weight in zip(graph.indices[graph.indptr[node]:graph.indptr[node + 1]],
+                                 graph.weights[graph.indptr[node]:graph.indptr[node + 1]]):
+            matrix[other, node] += weight
+    strength = matrix.sum(axis=0)
+    dangling = strength == 0
+    matrix[:, ~dangling] /= strength[~dangling]
+    expected = np.full(n, 1 / n)
+    for _ in range(1000):
+        expected = (1 - 0.85 + 0.85 * expected[dangling].sum()) / n + 0.85 * matrix @ expected
+    assert abs(rank.sum() - 1) < 1e-9
+    np.testing.assert_allclose(rank, expected, atol=1e-9)
+    assert graph.top_nodes(rank, 2) == np.argsort(-expected)[:2].tolist()
+
+
+def test_sub_edges_are_listed_once():
+    graph = Graph.from_json(data)
+    assert sorted(graph.sub_edges([0, 1, 2])) == [(0, 1, 2.0), (0, 2, 4.0), (1, 2, 1.0)]
+    assert graph.sub_edges([2]) == []
+
+
+def test_names_sharing_a_hash_are_kept_apart(monkeypatch):
+    from opendigger import network
+    monkeypatch.setattr(network, "hash", lambda name: 0, raising=False)
+    graph = Graph.from_json(data)
+    assert graph.names == ["a", "b", "c", "d", "e"]
+    assert graph.indptr.tolist() == [0, 3, 5, 8, 8, 9]
@@ -0,0 +1,42 @@
+from opendigger import fetch
+from opendigger import opendigger as od
+
+
+def file_names(urls):
+    return [url.rsplit("/", 1)[1][:-len(".json")] for url in urls]
+
+
+def test_plan_urls_of_indexes():
+    urls = od.OpenDigger().plan_urls("a/b", index="all")
+    assert file_names(urls) == ["openrank", "activity", "attention"]
+    assert all(url.startswith(od.prefix + "a/b/") for url in urls)
+
+
+def test_plan_urls_of_all_metrics():
+    names = file_names(od.OpenDigger().plan_urls("a/b", metric="all"))
+    # networks are left out of all, metrics only shown for one month need a month
+    assert "developer_network" not in names
+    assert "participants" not in names
+    assert "stars" in names and "change_requests" in names
+
+
+def test_plan_urls_of_one_month():
+    names = file_names(od.OpenDigger().plan_urls("a/b", metric="all", month="2023-01"))
+    assert "participants" in names
+    assert "new_contributors" in names
+
+
+def test_prefetched_urls_are_not_requested_again(server):
+    urls = [server.prefix + "a/b/" + name + ".json" for name in ["openrank", "activity", "attention"]]
+    fetch.prefetch(urls, workers=3)
+    assert server.requests == 3
+    for url in urls:
+        assert isinstance(fetch.get_url_json(url), dict)
+    assert server.requests == 3
+
+
+def test_failed_prefetch_gives_none(server, capsys):
+    url = server.prefix + "missing/repo/openrank.json"
+    fetch.prefetch([url])
+    assert fetch.get_url_json(url) is None
+    assert "404" in capsys.readouterr().out
@@ -0,0 +1,51 @@
+import os
+
+from opendigger import opendigger as od
+from opendigger import render
+from opendigger.render import ChartRenderer, render_line_chart, set_chart_renderer
+from opendigger.report import ReportWriter
+
+dates = ["01/2023", "02/2023", "03/2023", "04/2023", "05/2023"]
+
+
+def test_charts_are_rendered_in_worker_processes(tmp_path):
+    renderer = ChartRenderer(2)
+    paths = [str(tmp_path / f"chart{i}.png") for i in range(2)]
+    for i, path in enumerate(paths):
+        renderer.submit(render_line_chart, path, dates, [i, 2, 3, 4, 5], "OpenRank", "red")
+    renderer.shutdown()
+    assert renderer.rendered == 2
+    assert all(os.path.getsize(path) > 0 for path in paths)
+
+
+def test_failed_render_is_reported(tmp_path, capsys):
+    renderer = ChartRenderer(1)
+    renderer.submit(render_line_chart, str(tmp_path / "missing" / "chart.png"), dates, [1, 2, 3, 4, 5], "OpenRank", "red")
+    renderer.shutdown()
+    assert renderer.rendered == 0
+    assert "Failed to render" in capsys.readouterr().out
+
+
+def test_unchanged_charts_are_not_rendered_again(tmp_path):
+    path = str(tmp_path / "chart.png")
+    for expected in [(1, 0), (0, 1)]:
+        renderer = ChartRenderer(1)
+        renderer.submit(render_line_chart, path, dates, [1, 2, 3, 4, 5], "OpenRank", "red")
+        renderer.shutdown()
+        assert (renderer.rendered, renderer.unchanged) == expected
+    renderer = ChartRenderer(1)
+    renderer.submit(render_line_chart, path, dates, [1, 2, 3, 4, 6], "OpenRank", "red")
+    renderer.shutdown()
+    assert renderer.rendered == 1
+
+
+def test_issue_charts_of_a_report_are_unchanged_on_the_next_run(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(od, "prefix", server.prefix)
+    for expected in [(3, 0), (0, 3)]:
+        set_chart_renderer(ChartRenderer(1))
+        with ReportWriter(str(tmp_path / "OpenDiggerInfo.md")) as f:
+            od.OpenDigger().display_issues("a/b", "2023-06", f, True)
+        renderer = render.chart_renderer
+        renderer.wait()
+        assert (renderer.rendered, renderer.unchanged) == expected
+    set_chart_renderer(ChartRenderer(1))
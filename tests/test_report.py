@@ -0,0 +1,78 @@
+import sys
+import json
+
+import numpy as np
+import pytest
+
+from opendigger import opendigger as od
+from opendigger.report import ReportWriter, markdown_table
+from opendigger.series import Series, parse_month
+
+series = Series(np.arange(parse_month("2023-01"), parse_month("2023-01") + 5, dtype=np.int64),
+                np.array([1.0, 2.5, np.nan, 4.0, 5.0]), np.array([True, False, False, True, True]))
+
+
+def test_markdown_table_has_four_months_per_row():
+    table = markdown_table("OpenRank", "OpenRank", series)
+    lines = table.splitlines()
+    assert lines[:3] == ["###  OpenRank data table", "|Dates and OpenRank||||", "| --- | --- | --- | --- |"]
+    assert lines[3] == "| 2023-01: 1 | 2023-02: 2.5 | 2023-03: nan | 2023-04: 4 |"
+    assert lines[4] == "| 2023-05: 5 |  |  |  |"
+
+
+def test_markdown_report_holds_text_and_tables(tmp_path):
+    path = tmp_path / "OpenDiggerInfo.md"
+    with ReportWriter(str(path)) as f:
+        f.write("## a/b\n")
+        f.table("a/b", "openrank", "OpenRank", "OpenRank", series)
+    assert path.read_text() == "## a/b\n" + markdown_table("OpenRank", "OpenRank", series)
+
+
+def test_csv_report_holds_one_record_per_month(tmp_path):
+    path = tmp_path / "OpenDiggerInfo.csv"
+    with ReportWriter(str(path), "csv") as f:
+        f.write("## a/b\n")
+        f.table("a/b", "openrank", "OpenRank", "OpenRank", series)
+    lines = path.read_text().splitlines()
+    assert lines[:3] == ["repo,metric,month,value", "a/b,openrank,2023-01,1", "a/b,openrank,2023-02,2.5"]
+    assert lines[3] == "a/b,openrank,2023-03,"
+    assert len(lines) == 6
+
+
+def test_jsonl_report_holds_one_record_per_month(tmp_path):
+    path = tmp_path / "OpenDiggerInfo.jsonl"
+    with ReportWriter(str(path), "jsonl") as f:
+        f.table("a/b", "activity", "Activity", "Activity", series)
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert records[0] == {"repo": "a/b", "metric": "activity", "month": "2023-01", "value": 1}
+    assert records[2]["value"] is None
+    assert len(records) == 5
+
+
+def test_links_are_relative_to_the_report(tmp_path):
+    with ReportWriter(str(tmp_path / "OpenDiggerInfo.md"), chart_dir=str(tmp_path / "a" / "b")) as f:
+        assert f.link(str(tmp_path / "a" / "b" / "OpenRank.png")) == "./a/b/OpenRank.png"
+        assert f.link(str(tmp_path.parent / "OpenRank.png")) == "../OpenRank.png"
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_metric_reports_need_markdown(fmt, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["opendigger", "-repo", "a/b", "-metric", "stars", "-d", fmt])
+    with pytest.raises(SystemExit):
+        od.main()
+    assert f"-d {fmt} only holds the -index tables" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_index_of_one_month_is_one_record(fmt, server, monkeypatch, tmp_path):
+    monkeypatch.setattr(od, "prefix", server.prefix)
+    path = tmp_path / f"OpenDiggerInfo.{fmt}"
+    with ReportWriter(str(path), fmt) as f:
+        od.OpenDigger().display_index("a/b", "openrank", "OpenRank", "OpenRank", "2023-05", f, True)
+    value = json.loads(server.body("a/b", "openrank"))["2023-05"]
+    lines = path.read_text().splitlines()
+    if fmt == "csv":
+        assert lines == ["repo,metric,month,value", f"a/b,openrank,2023-05,{value}"]
+    else:
+        assert [json.loads(line) for line in lines] == [{"repo": "a/b", "metric": "openrank", "month": "2023-05",
+                                                        "value": value}]
@@ -0,0 +1,41 @@
+from opendigger import fetch
+from opendigger.cache import ResponseCache, conditional_headers
+
+
+def test_conditional_headers():
+    assert conditional_headers({"etag": '"x"', "last_modified": None}) == {"If-None-Match": '"x"'}
+    assert conditional_headers({"last_modified": "Mon, 01 May 2023 00:00:00 GMT"}) == \
+        {"If-Modified-Since": "Mon, 01 May 2023 00:00:00 GMT"}
+    assert conditional_headers({}) == {}
+
+
+def test_stale_entry_is_revalidated(server, tmp_path):
+    # a ttl of 0 makes every entry stale, so the second load asks the server with the etag
+    fetch.set_response_cache(ResponseCache(str(tmp_path), ttl=0))
+    url = server.prefix + "a/b/openrank.json"
+    first = fetch.load_json(url)
+    second = fetch.load_json(url)
+    assert second == first
+    assert server.requests == 2
+    stats = fetch.cache_stats
+    assert (stats.hits, stats.not_modified, stats.downloaded) == (0, 1, 1)
+    assert stats.bytes_saved == stats.bytes_downloaded > 0
+
+
+def test_fresh_entry_is_not_requested(server, tmp_path):
+    fetch.set_response_cache(ResponseCache(str(tmp_path)))
+    url = server.prefix + "a/b/openrank.json"
+    fetch.load_json(url)
+    fetch.load_json(url)
+    assert server.requests == 1
+    assert fetch.cache_stats.hits == 1
+
+
+def test_refresh_revalidates_fresh_entries(server, tmp_path):
+    fetch.set_response_cache(ResponseCache(str(tmp_path)))
+    url = server.prefix + "a/b/openrank.json"
+    fetch.load_json(url)
+    fetch.set_response_cache(ResponseCache(str(tmp_path)), refresh=True)
+    fetch.load_json(url)
+    assert server.requests == 2
+    assert fetch.cache_stats.not_modified == 1
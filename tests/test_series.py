@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+import pytest
+
+from opendigger import opendigger as od
+from opendigger.series import Series, parse_month, month_key
+
+data_dir = os.path.join(os.path.dirname(__file__), "data")
+
+
+# stars.json of kubernetes/kubernetes as in examples/kubernetes: the months up to
+# 2023-05 followed by the raw value of 2021-10
+def kubernetes_stars():
+    with open(os.path.join(data_dir, "kubernetes_stars.json")) as f:
+        return json.load(f)
+
+
+def test_parse_month():
+    assert parse_month("2023-05") == 2023 * 12 + 4
+    assert month_key(parse_month("2023-05")) == "2023-05"
+    assert parse_month("2021-10-raw") is None
+    assert parse_month("avg") is None
+
+
+def test_raw_key_is_not_a_month():
+    data = kubernetes_stars()
+    assert list(data)[-1] == "2021-10-raw"
+    series = Series.from_json(data)
+    assert len(series) == len(data) - 1
+    assert series.keys()[0] == "2015-01"
+    assert series.keys()[-1] == "2023-05"
+    assert series.value_list()[-1] == 922
+    assert dict(series.items())["2021-10"] == 1062
+
+
+def test_months_are_sorted_and_missing_values_are_nan():
+    series = Series.from_json({"2023-02": 2, "2023-01": None, "2022-12": 1.5})
+    assert series.keys() == ["2022-12", "2023-01", "2023-02"]
+    assert np.isnan(series.values[1])
+    assert series.value_list()[0] == 1.5
+    assert series.value_list()[2] == 2 and isinstance(series.value_list()[2], int)
+
+
+def test_between_and_last():
+    series = Series.from_json(kubernetes_stars())
+    assert series.between("2023-01", "2023-03").value_list() == [802, 870, 878]
+    assert series.between("2023-04").keys() == ["2023-04", "2023-05"]
+    assert series.between(end="2015-02").keys() == ["2015-01", "2015-02"]
+    assert series.last(2).keys() == ["2023-04", "2023-05"]
+    assert len(series.last(1000)) == len(series)
+
+
+def test_index_table_ends_with_the_latest_month(server, monkeypatch, capsys):
+    monkeypatch.setattr(od, "prefix", server.prefix)
+    monkeypatch.setattr(od, "plotext_plot", lambda *args, **kwargs: None)
+    od.OpenDigger().display_index("a/b", "openrank", "OpenRank", "OpenRank")
+    out = capsys.readouterr().out
+    assert "2023-12: " in out
+    assert "raw" not in out
+
+
+def test_select_cuts_the_range_then_keeps_the_last_months():
+    series = Series.from_json(kubernetes_stars())
+    assert series.select().keys() == series.keys()
+    assert series.select("2022-01", "2022-12", 3).keys() == ["2022-10", "2022-11", "2022-12"]
+    assert series.select(count=2).keys() == ["2023-04", "2023-05"]
+    assert len(series.select("2030-01")) == 0
+
+
+def test_month_and_count_arguments():
+    assert od.month_argument("2023-05") == "2023-05"
+    for value in ["2023-13", "2023-5", "23-05", "2023-05-01"]:
+        with pytest.raises(argparse.ArgumentTypeError):
+            od.month_argument(value)
+    assert od.positive_int("12") == 12
+    for value in ["0", "-1", "1.5", "x"]:
+        with pytest.raises(argparse.ArgumentTypeError):
+            od.positive_int(value)
+
+
+def test_period_of_the_history(server, monkeypatch, capsys):
+    monkeypatch.setattr(od, "prefix", server.prefix)
+    monkeypatch.setattr(od, "plotext_plot", lambda *args, **kwargs: None)
+    open_digger = od.OpenDigger()
+    open_digger.period = ("2023-01", "2023-06", 2)
+    assert open_digger.describe_period() == "2023-01 to 2023-06, last 2 months"
+    open_digger.display_index("a/b", "openrank", "OpenRank", "OpenRank")
+    out = capsys.readouterr().out
+    assert "2023-05: " in out and "2023-06: " in out
+    assert "2023-04: " not in out and "2023-07: " not in out
+    open_digger.period = ("2030-01", None, None)
+    open_digger.display_index("a/b", "openrank", "OpenRank", "OpenRank")
+    assert "No OpenRank data in 2030-01 to latest month" in capsys.readouterr().out
+
+
+def test_month_cannot_be_combined_with_a_period(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["opendigger", "-repo", "a/b", "-index", "openrank", "-month", "2023-01",
+                                      "-last", "3"])
+    with pytest.raises(SystemExit):
+        od.main()
+    assert "-month cannot be combined" in capsys.readouterr().err
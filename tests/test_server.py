@@ -0,0 +1,149 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from opendigger import fetch
+from opendigger import opendigger as od
+from opendigger.cache import ResponseCache
+from opendigger.server import Api, JsonStore, NotFound, load_url, reload_url
+
+
+def test_store_evicts_the_least_recently_used_files():
+    store = JsonStore(lambda url: {"url": url, "values": list(range(100))}, 1, 3600)
+    try:
+        store.get("a")
+        entry = store.get("a")
+        size = entry.size
+        store.max_size = 2 * size
+        store.get("b")
+        store.get("a")
+        store.get("c")
+        assert list(store.entries) == ["a", "c"]
+        stats = store.stats()
+        assert (stats["entries"], stats["bytes"], stats["hits"], stats["misses"]) == (2, 2 * size, 2, 3)
+    finally:
+        store.close()
+
+
+def test_store_loads_a_url_once_for_concurrent_callers():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def load(url):
+        calls.append(url)
+        started.set()
+        release.wait(5)
+        return [url]
+
+    store = JsonStore(load, 2 ** 20, 3600)
+    try:
+        with ThreadPoolExecutor(4) as pool:
+            futures = [pool.submit(store.get, "a") for _ in range(4)]
+            started.wait(5)
+            release.set()
+            entries = [future.result() for future in futures]
+        assert calls == ["a"]
+        assert all(entry is entries[0] for entry in entries)
+        assert entries[0].encoded == b'["a"]'
+    finally:
+        store.close()
+
+
+def test_stale_files_are_served_while_they_reload():
+    versions = iter([1, 2])
+    store = JsonStore(lambda url: {"version": next(versions)}, 2 ** 20, 0)
+    try:
+        assert store.get("a").data == {"version": 1}
+        # stale: the old entry is answered and a reload starts in the background
+        assert store.get("a").data == {"version": 1}
+        reload = store.loading.get("a")
+        if reload is not None:
+            reload.result(5)
+        store.max_age = 3600
+        assert store.get("a").data == {"version": 2}
+        assert store.stats()["refreshes"] == 1
+    finally:
+        store.close()
+
+
+def test_refresh_asks_the_server_even_for_fresh_cache_entries(server, tmp_path):
+    fetch.set_response_cache(ResponseCache(str(tmp_path)))
+    url = server.prefix + "a/b/openrank.json"
+    store = JsonStore(load_url, 2 ** 20, 0, reload_url)
+    try:
+        first = store.get(url).data
+        store.get(url)
+        store.loading[url].result(5)
+        assert store.get(url).data == first
+        assert server.requests == 2
+        assert fetch.cache_stats.not_modified == 1
+    finally:
+        store.close()
+
+
+def test_load_errors_reach_the_caller_and_are_not_kept():
+    def load(url):
+        raise RuntimeError("server error")
+
+    store = JsonStore(load, 2 ** 20, 3600)
+    try:
+        with pytest.raises(RuntimeError):
+            store.get("a")
+        assert store.stats()["entries"] == 0
+        assert store.loading == {}
+    finally:
+        store.close()
+
+
+@pytest.fixture
+def api():
+    data = {"2023-01": 1, "2023-02": 2}
+    store = JsonStore(lambda url: None if "missing" in url else dict(data, url=url), 2 ** 20, 3600)
+    api = Api(od.OpenDigger(), store, "https://example.org/")
+    yield api
+    store.close()
+    api.loader.shutdown()
+
+
+def test_query_answers_the_files_of_the_handler(api):
+    body = json.loads(api.query("a/b", "metrics", "code_change_line"))
+    assert (body["repo"], body["metric"], body["month"]) == ("a/b", "code_change_line", None)
+    assert list(body["files"]) == od.metric_files["code_change_line"]
+    assert body["files"]["code_change_lines_add"]["url"] == "https://example.org/a/b/code_change_lines_add.json"
+
+
+def test_query_of_one_month(api):
+    body = json.loads(api.query("a/b", "indexes", "all", "2023-02"))
+    assert body["files"] == {"openrank": 2, "activity": 2, "attention": 2}
+    assert json.loads(api.query("a/b", "indexes", "openrank", "2020-01"))["files"] == {"openrank": None}
+
+
+def test_query_of_one_month_of_a_distribution(server, monkeypatch):
+    monkeypatch.setattr(od, "prefix", server.prefix)
+    store = JsonStore(load_url, 2 ** 20, 3600)
+    api = Api(od.OpenDigger(), store, server.prefix, workers=2)
+    try:
+        files = json.loads(api.query("a/b", "metrics", "issues", "2023-02"))["files"]
+        data = json.loads(server.body("a/b", "issue_response_time"))
+        assert files["issue_response_time"] == {part: data[part]["2023-02"] for part in data}
+        assert json.loads(api.query("a/b", "metrics", "issues", "2030-01"))["files"]["issue_response_time"] is None
+        assert api.loader._max_workers == 2
+    finally:
+        store.close()
+        api.loader.shutdown()
+
+
+def test_query_of_all_metrics_leaves_the_networks_out(api):
+    files = json.loads(api.query("a/b", "metrics", "all", "2023-01"))["files"]
+    assert list(files) == [file for name in od.OpenDigger().handler_names(metric="all")
+                           for file in od.metric_files[name]]
+    assert "developer_network" not in files
+
+
+def test_query_of_missing_files_and_unknown_names(api):
+    assert json.loads(api.query("missing/repo", "indexes", "openrank"))["files"] == {"openrank": None}
+    with pytest.raises(NotFound):
+        api.query("a/b", "metrics", "nothing")
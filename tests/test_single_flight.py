@@ -0,0 +1,60 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from opendigger.fetch import SingleFlight
+
+
+def test_concurrent_callers_share_one_load():
+    memo = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def load(url):
+        calls.append(url)
+        started.set()
+        release.wait(5)
+        return {"url": url}
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(memo.get, "u", load) for _ in range(4)]
+        started.wait(5)
+        release.set()
+        results = [future.result() for future in futures]
+    assert calls == ["u"]
+    assert all(result is results[0] for result in results)
+    assert (memo.loaded, memo.absorbed) == (1, 3)
+
+
+def test_errors_reach_every_caller():
+    memo = SingleFlight()
+
+    def load(url):
+        raise ValueError(url)
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            memo.get("u", load)
+    assert memo.loaded == 1
+
+
+def test_warm_claims_are_not_counted_as_uses():
+    memo = SingleFlight()
+    future, owner = memo.claim("u", warm=True)
+    assert owner
+    future.set_result(1)
+    assert memo.get("u", None) == 1
+    assert memo.absorbed == 0
+    assert memo.get("u", None) == 1
+    assert memo.absorbed == 1
+
+
+def test_forget_prefix():
+    memo = SingleFlight()
+    memo.get("https://x/a/b/openrank.json", lambda url: 1)
+    memo.get("https://x/c/d/openrank.json", lambda url: 2)
+    memo.forget_prefix("https://x/a/b/")
+    assert "https://x/a/b/openrank.json" not in memo
+    assert "https://x/c/d/openrank.json" in memo
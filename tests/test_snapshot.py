@@ -0,0 +1,69 @@
+import json
+import urllib.error
+
+import pytest
+
+from opendigger import fetch
+from opendigger.engine import FetchEngine
+from opendigger.snapshot import Snapshot, SnapshotWriter, export_snapshot
+
+prefix = "https://example.org/github/"
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "data.odsnap")
+    writer = SnapshotWriter(path, prefix)
+    writer.add(prefix + "a/b/openrank.json", b'{"2023-01":1.5}')
+    writer.add(prefix + "a/b/stars.json", b'{"2023-01":3}')
+    writer.repos.append("a/b")
+    writer.close()
+    bundle = Snapshot(path, prefix)
+    try:
+        assert bundle.key(prefix + "a/b/openrank.json") == "a/b/openrank.json"
+        assert bundle.load_json(prefix + "a/b/openrank.json") == {"2023-01": 1.5}
+        assert bundle.read(prefix + "a/b/stars.json") == b'{"2023-01":3}'
+        assert bundle.read(prefix + "a/b/activity.json") is None
+        with pytest.raises(urllib.error.HTTPError) as error:
+            bundle.load_json(prefix + "a/b/activity.json")
+        assert error.value.code == 404
+        assert bundle.index["repos"] == ["a/b"]
+        assert bundle.served == 1
+    finally:
+        bundle.close()
+
+
+def test_aborted_writer_leaves_nothing(tmp_path):
+    writer = SnapshotWriter(str(tmp_path / "data.odsnap"), prefix)
+    writer.add(prefix + "a/b/openrank.json", b"{}")
+    writer.abort()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "data.odsnap"
+    path.write_bytes(b"not a snapshot at all, just some bytes")
+    with pytest.raises(ValueError):
+        Snapshot(str(path))
+    (tmp_path / "empty.odsnap").write_bytes(b"")
+    with pytest.raises(ValueError):
+        Snapshot(str(tmp_path / "empty.odsnap"))
+
+
+def test_exported_snapshot_answers_like_the_server(server, tmp_path, capsys):
+    path = str(tmp_path / "data.odsnap")
+    engine = FetchEngine(fetch.download_json, rate=0)
+
+    def plan_urls(repo_name):
+        return [server.prefix + repo_name + "/" + name + ".json" for name in ["openrank", "activity", "attention"]]
+
+    try:
+        export_snapshot(path, ["a/b", "missing/repo"], plan_urls, engine, 4, server.prefix)
+    finally:
+        engine.close()
+    assert "missing/repo: 0 files, 3 not available" in capsys.readouterr().out
+    fetch.set_snapshot(Snapshot(path, server.prefix))
+    requests = server.requests
+    assert fetch.load_json(server.prefix + "a/b/openrank.json") == json.loads(server.body("a/b", "openrank"))
+    assert server.requests == requests
+    with pytest.raises(urllib.error.HTTPError):
+        fetch.load_json(server.prefix + "missing/repo/openrank.json")
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from opendigger import fetch
+from opendigger.stream import iter_members, find_member
+
+body = json.dumps({
+    "2023-01": 1.5, "2023-02": [1, 2, {"a": "b"}], "2023-03": None, "2023-04": "déjà vu",
+    "2023-05": 12345.678e-2, "2023-06": {"x": [True, False]}, "2021-10-raw": 391,
+}, indent=1, ensure_ascii=False).encode("utf-8")
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(body)])
+def test_members_match_json_loads_at_any_chunk_size(size):
+    members = list(iter_members(chunked(body, size)))
+    assert {key: value for key, value, _, _ in members} == json.loads(body)
+    assert [key for key, _, _, _ in members] == list(json.loads(body))
+    # start / end are the byte range of every value in the body
+    for key, value, start, end in members:
+        assert json.loads(body[start:end]) == value
+
+
+def test_find_member_stops_at_the_month():
+    history = json.dumps({f"{2000 + i // 12}-{i % 12 + 1:02d}": list(range(50)) for i in range(240)}).encode()
+    read = []
+
+    def chunks():
+        for chunk in chunked(history, 256):
+            read.append(chunk)
+            yield chunk
+
+    assert find_member(chunks(), "2001-02") == (True, list(range(50)))
+    assert len(b"".join(read)) < len(history) // 4
+    assert find_member(chunked(body, 8), "2030-01") == (False, None)
+    assert find_member(chunked(body, 8), "2023-03") == (True, None)
+
+
+def test_empty_and_invalid_bodies():
+    assert list(iter_members([b" { } "])) == []
+    with pytest.raises(ValueError):
+        list(iter_members([b"[1, 2]"]))
+    with pytest.raises(ValueError):
+        list(iter_members(chunked(b'{"2023-01": 1 "2023-02": 2}', 3)))
+    with pytest.raises(ValueError):
+        list(iter_members([b'{"2023-01": 1, "2023-02": ']))
+
+
+def test_only_large_files_are_streamed(server, monkeypatch):
+    streamed = []
+    load_month = fetch.load_month
+    monkeypatch.setattr(fetch, "load_month", lambda url, month: streamed.append(url) or load_month(url, month))
+    counts_url = server.prefix + "a/b/stars.json"
+    detail_url = server.prefix + "a/b/active_dates_times.json"
+    assert fetch.get_json_data(counts_url, "2023-06") == json.loads(server.body("a/b", "stars"))["2023-06"]
+    assert counts_url in fetch.memo
+    assert fetch.get_json_data(detail_url, "2023-06", stream=True) == \
+        json.loads(server.body("a/b", "active_dates_times"))["2023-06"]
+    assert streamed == [detail_url]
+    assert detail_url not in fetch.memo
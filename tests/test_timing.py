@@ -0,0 +1,65 @@
+import os
+import json
+import threading
+
+import pytest
+
+from opendigger import timing
+from opendigger.timing import Tracer, NullTracer, set_tracer, span
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer()
+    set_tracer(tracer)
+    yield tracer
+    set_tracer(NullTracer())
+
+
+def test_spans_are_chrome_trace_events(tracer):
+    with span("fetch", "https://example.org/a.json", status="downloaded") as event:
+        event["bytes"] = 2048
+    with pytest.raises(ValueError):
+        with span("parse", "https://example.org/a.json"):
+            raise ValueError("bad json")
+    fetch, parse = tracer.events
+    assert (fetch["name"], fetch["cat"], fetch["ph"]) == ("https://example.org/a.json", "fetch", "X")
+    assert fetch["args"] == {"status": "downloaded", "bytes": 2048}
+    assert (fetch["pid"], fetch["tid"]) == (os.getpid(), threading.get_ident())
+    assert parse["cat"] == "parse"
+    assert 0 <= fetch["ts"] <= parse["ts"]
+    assert fetch["dur"] >= 0
+
+
+def test_worker_spans_keep_their_process(tracer):
+    tracer.add("render", "OpenRank.png", tracer.origin + 1, 0.25, {"bytes": 10}, pid=1234)
+    event = tracer.events[0]
+    assert (event["pid"], event["tid"], event["ts"], event["dur"]) == (1234, 0, 1e6, 250000.0)
+
+
+def test_summary_lists_phases_in_order(tracer):
+    tracer.add("write", "report.md", tracer.origin, 0.001)
+    tracer.add("fetch", "slow.json", tracer.origin, 0.5, {"status": "downloaded", "bytes": 100})
+    tracer.add("fetch", "fast.json", tracer.origin, 0.01, {"status": "cached"})
+    lines = tracer.summary().splitlines()
+    assert lines[2].split()[:2] == ["fetch", "2"]
+    assert "1 downloaded, 1 cached" in lines[2]
+    assert lines[3].split()[0] == "write"
+    assert lines[4] == "Slowest fetches:"
+    assert lines[5].split()[-1] == "slow.json"
+
+
+def test_write(tracer, tmp_path):
+    with span("display", "openrank"):
+        pass
+    path = tmp_path / timing.default_trace_file
+    tracer.write(str(path))
+    trace = json.loads(path.read_text())
+    assert trace["displayTimeUnit"] == "ms"
+    assert [event["name"] for event in trace["traceEvents"]] == ["openrank"]
+
+
+def test_null_tracer_records_nothing():
+    with span("fetch", "a.json") as event:
+        event["bytes"] = 1
+    assert isinstance(timing.tracer, NullTracer)